@@ -4,12 +4,23 @@ Buddy Agent - Professional Web Interface
 A clean, professional web application for document Q&A
 """
 
+import hashlib
 import os
 import sys
 import logging
+import tempfile
 from pathlib import Path
 from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from flask.json.provider import JSONProvider
+from werkzeug.exceptions import HTTPException
 from werkzeug.utils import secure_filename
+
+# orjson is an optional accelerator for JSON responses
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 import asyncio
 from datetime import datetime
 
@@ -20,60 +31,75 @@ sys.path.insert(0, str(buddy_agent_dir))
 
 # Import the Buddy Agent
 from buddy_agent.sub_agents.rag_retriever.better_search import BetterSearchEngine
+from buddy_agent.semantic_cache import SemanticCache
+from tasks import enqueue_uploads, processed_docs
 
 # Initialize Flask app
 app = Flask(__name__)
 app.secret_key = 'buddy_agent_secret_key_2024'
 
+class ORJSONProvider(JSONProvider):
+    """Serialize JSON responses with orjson instead of the stdlib encoder."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+if ORJSON_AVAILABLE:
+    app.json = ORJSONProvider(app)
+else:
+    # At least skip per-character escaping of non-ASCII response text
+    app.json.ensure_ascii = False
+
 # Configuration
 UPLOAD_FOLDER = 'uploads'
-ALLOWED_EXTENSIONS = {'pdf', 'docx', 'txt'}
+ALLOWED_EXTENSIONS = frozenset({'pdf', 'docx', 'txt'})
 MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB max file size
 
+# Reject oversized uploads before they ever reach a disk write
+app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
+
 # Create upload directory
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 # Initialize search engine
 search_engine = BetterSearchEngine(collection_name="web_documents")
 
+# Cache for repeat/near-duplicate questions; invalidated whenever the corpus changes
+query_cache = SemanticCache(capacity=1024)
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def stream_upload_to_disk(stream):
+    """Stream an upload into a temp file in 1 MiB chunks, hashing as it goes.
+
+    Returns (temp_path, content_hash) - the caller keeps or discards the file.
+    """
+    hasher = hashlib.sha256()
+    # buffering=0 writes each 1 MiB chunk straight through - one write
+    # syscall per chunk, no extra copy through a BufferedWriter
+    with tempfile.NamedTemporaryFile(delete=False, dir=UPLOAD_FOLDER, buffering=0) as tmp:
+        while chunk := stream.read(1 << 20):
+            hasher.update(chunk)
+            tmp.write(chunk)
+    return tmp.name, hasher.hexdigest()
+
+def file_extension(filename):
+    """Get the lowercased extension of a filename, without the dot."""
+    return os.path.splitext(filename)[1][1:].lower()
+
 def allowed_file(filename):
     """Check if file extension is allowed."""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return file_extension(filename) in ALLOWED_EXTENSIONS
 
-def extract_text_from_file(file_path, file_type):
-    """Extract text from uploaded file."""
-    try:
-        if file_type == 'pdf':
-            import pdfplumber
-            with pdfplumber.open(file_path) as pdf:
-                text = ""
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += f"\n{page_text}\n"
-                return text
-        
-        elif file_type == 'docx':
-            from docx import Document
-            doc = Document(file_path)
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            return text
-        
-        elif file_type == 'txt':
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        
-        return ""
-    
-    except Exception as e:
-        logger.error(f"Error extracting text: {str(e)}")
-        return ""
+@app.errorhandler(413)
+def request_too_large(error):
+    """Return JSON when an upload exceeds MAX_FILE_SIZE."""
+    return jsonify({'error': f'File too large. Maximum size is {MAX_FILE_SIZE // (1024 * 1024)}MB.'}), 413
 
 @app.route('/')
 def index():
@@ -82,61 +108,67 @@ def index():
 
 @app.route('/upload', methods=['POST'])
 def upload_file():
-    """Handle file upload and processing."""
+    """Handle file upload - save bytes, queue background processing, return 202."""
     try:
-        if 'file' not in request.files:
-            flash('No file selected', 'error')
-            return redirect(url_for('index'))
-        
-        file = request.files['file']
-        if file.filename == '':
-            flash('No file selected', 'error')
-            return redirect(url_for('index'))
-        
-        if file and allowed_file(file.filename):
+        files = [f for f in request.files.getlist('file') if f.filename]
+        if not files:
+            return jsonify({'error': 'No file selected'}), 400
+
+        if not all(allowed_file(f.filename) for f in files):
+            return jsonify({'error': 'Invalid file type. Please upload PDF, DOCX, or TXT files.'}), 400
+
+        # One timestamp per request; per-file uniqueness comes from the index
+        now = datetime.now()
+        doc_id_prefix = f"doc_{now.strftime('%Y%m%d_%H%M%S')}"
+        upload_time = now.isoformat()
+
+        uploads = []
+        for index, file in enumerate(files):
+            # Stream to disk without buffering the whole file in memory;
+            # the heavy parsing happens on the worker thread
+            temp_path, idem_key = stream_upload_to_disk(file.stream)
+
+            # Idempotency check - re-uploading identical content is a no-op
+            if idem_key in processed_docs:
+                os.remove(temp_path)
+                continue
+
             filename = secure_filename(file.filename)
             file_path = os.path.join(UPLOAD_FOLDER, filename)
-            file.save(file_path)
-            
-            # Extract text from file
-            file_type = filename.rsplit('.', 1)[1].lower()
-            text = extract_text_from_file(file_path, file_type)
-            
-            if not text.strip():
-                flash('Could not extract text from file', 'error')
-                return redirect(url_for('index'))
-            
-            # Add document to search engine
-            document_id = f"doc_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            success = search_engine.add_document(
-                document_id=document_id,
-                text=text,
-                metadata={
+            os.replace(temp_path, file_path)
+
+            file_type = file_extension(filename)
+            uploads.append({
+                "file_path": file_path,
+                "filename": filename,
+                "file_type": file_type,
+                "document_id": f"{doc_id_prefix}_{index}",
+                "metadata": {
                     "filename": filename,
                     "file_type": file_type,
-                    "upload_time": datetime.now().isoformat(),
-                    "file_size": len(text)
+                    "upload_time": upload_time
                 }
-            )
-            
-            if success:
-                flash(f'Document "{filename}" uploaded and processed successfully!', 'success')
-                # Clean up uploaded file
-                os.remove(file_path)
-            else:
-                flash('Failed to process document', 'error')
-                return redirect(url_for('index'))
-        
-        else:
-            flash('Invalid file type. Please upload PDF, DOCX, or TXT files.', 'error')
-            return redirect(url_for('index'))
-    
+            })
+            processed_docs.add(idem_key)
+
+        if not uploads:
+            return jsonify({'status': 'already_processed', 'doc_ids': []})
+
+        # One queued job indexes the whole batch in a single engine call
+        enqueue_uploads(search_engine, uploads, query_cache=query_cache)
+        doc_ids = [upload["document_id"] for upload in uploads]
+
+        return jsonify({'status': 'queued', 'doc_ids': doc_ids}), 202
+
+    except HTTPException:
+        # Werkzeug raises these lazily - reading request.files on an
+        # oversized body raises RequestEntityTooLarge right here inside
+        # the try. Re-raise so the registered handlers (the 413 JSON
+        # handler above) produce the response instead of a generic 500.
+        raise
     except Exception as e:
         logger.error(f"Upload error: {str(e)}")
-        flash('An error occurred while processing the file', 'error')
-        return redirect(url_for('index'))
-    
-    return redirect(url_for('index'))
+        return jsonify({'error': 'An error occurred while processing the file'}), 500
 
 @app.route('/ask', methods=['POST'])
 def ask_question():
@@ -148,8 +180,11 @@ def ask_question():
         if not question:
             return jsonify({'error': 'Please enter a question'}), 400
         
-        # Search for relevant content
-        results = search_engine.search_similar(question, n_results=3, threshold=0.01)
+        # Check the semantic cache before scanning the corpus
+        results = query_cache.lookup(question)
+        if results is None:
+            results = search_engine.search_similar(question, n_results=3, threshold=0.01)
+            query_cache.insert(question, results)
         
         if not results:
             return jsonify({
@@ -201,6 +236,7 @@ def clear_documents():
     """Clear all documents."""
     try:
         search_engine.clear_collection()
+        query_cache.clear()
         flash('All documents cleared successfully!', 'success')
         return jsonify({'success': True})
     except Exception as e:
@@ -208,6 +244,7 @@ def clear_documents():
         return jsonify({'error': 'Failed to clear documents'}), 500
 
 if __name__ == '__main__':
+    # Development server only - deploy with `gunicorn -c gunicorn_conf.py app:app`
     print("🚀 Starting Buddy Agent Web Interface...")
     print("=" * 50)
     print("📱 Open your browser and go to: http://localhost:5000")
@@ -0,0 +1,44 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Shared document chunking for the Buddy Agent search engines.
+
+Window offsets are computed up front from a single range() instead of a
+data-dependent while loop, so chunking a document is one linear pass with
+no re-slicing and no stalled windows at the end of the text.
+"""
+
+from typing import Iterator, Tuple
+
+
+def split_into_chunks(text: str, chunk_size: int = 500, overlap: int = 100) -> Iterator[Tuple[int, int, str]]:
+    """Yield (start, end, window_text) for overlapping windows over text.
+
+    Args:
+        text: Document text to split
+        chunk_size: Maximum characters per window
+        overlap: Number of characters shared between consecutive windows
+
+    Yields:
+        (start, end, window_text) tuples in document order
+    """
+    if not text:
+        return
+    step = max(chunk_size - overlap, 1)
+    length = len(text)
+    for start in range(0, length, step):
+        end = min(start + chunk_size, length)
+        yield start, end, text[start:end]
+        if end == length:
+            break
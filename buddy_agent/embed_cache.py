@@ -0,0 +1,96 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Disk-backed embedding cache for the Buddy Agent ingest path.
+
+Embedding calls are the dominant cost when indexing documents, so chunk
+vectors are cached on disk keyed by a hash of the chunk text plus the
+model id. Re-uploading a document after a restart reloads its vectors
+instead of re-calling the embedding model. Each vector lives in its own
+.npy file, so storing a batch writes only the new entries instead of
+rewriting the whole cache.
+"""
+
+import hashlib
+import logging
+import os
+from typing import Dict, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """Content-hash keyed cache of chunk embeddings, persisted one .npy file per entry."""
+
+    def __init__(self, model_id: str, cache_dir: str = "./embedding_cache"):
+        """Initialize the embedding cache.
+
+        Args:
+            model_id: Identifier of the embedding model (names the cache directory)
+            cache_dir: Parent directory holding per-model caches
+        """
+        self.model_id = model_id
+        self.cache_dir = os.path.join(cache_dir, model_id)
+        # Archive written by the old single-file format, read once for migration
+        self._legacy_path = os.path.join(cache_dir, f"{model_id}.npz")
+        self._entries: Dict[str, np.ndarray] = {}
+        self._load()
+
+    @staticmethod
+    def key_for(text: str) -> str:
+        """Content hash used as the cache key for a chunk of text."""
+        return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Return the cached vectors for whichever keys are present."""
+        return {key: self._entries[key] for key in keys if key in self._entries}
+
+    def put_many(self, keys: List[str], vectors: List) -> None:
+        """Store fresh vectors, persisting only the new entries.
+
+        Each vector is written to its own file, so the disk work per
+        batch is proportional to the batch - not to everything cached
+        so far, which made large ingests quadratic under the old
+        whole-archive rewrite.
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            for key, vector in zip(keys, vectors):
+                arr = np.asarray(vector, dtype=np.float32)
+                self._entries[key] = arr
+                np.save(os.path.join(self.cache_dir, f"{key}.npy"), arr)
+        except Exception as e:
+            logger.error(f"❌ Error saving embedding cache: {str(e)}")
+
+    def _load(self):
+        """Warm the cache from disk if cached entries exist."""
+        try:
+            if os.path.isdir(self.cache_dir):
+                for name in os.listdir(self.cache_dir):
+                    if name.endswith(".npy"):
+                        self._entries[name[:-4]] = np.load(
+                            os.path.join(self.cache_dir, name)
+                        )
+            elif os.path.exists(self._legacy_path):
+                # Migrate a cache written by the old single-archive format;
+                # its entries are re-persisted per-file on the next put_many
+                with np.load(self._legacy_path) as data:
+                    self._entries = {key: data[key] for key in data.files}
+            if self._entries:
+                logger.info(f"📂 Loaded {len(self._entries)} cached embeddings for {self.model_id}")
+        except Exception as e:
+            logger.error(f"❌ Error loading embedding cache: {str(e)}")
+            self._entries = {}
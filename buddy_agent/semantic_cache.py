@@ -0,0 +1,86 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Semantic query cache for the Buddy Agent search path.
+
+Caches search results keyed by a locality-sensitive hash of the query so
+repeated and near-duplicate questions skip the full corpus scan. Queries
+are mapped to a hashed bag-of-words vector and signed with random
+projections (SimHash), so rephrasings with similar word sets collapse to
+the same cache entry.
+"""
+
+import logging
+import re
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r'\b\w+\b')
+
+
+class SemanticCache:
+    """LRU cache keyed by a random-projection hash of the query."""
+
+    def __init__(self, nbits: int = 16, dim: int = 256, capacity: int = 1024, seed: int = 0):
+        """Initialize the semantic cache.
+
+        Args:
+            nbits: Number of projection bits in the signature
+            dim: Dimension of the hashed bag-of-words vector
+            capacity: Maximum number of cached entries (LRU eviction)
+            seed: Seed for the random projection matrix (stable signatures)
+        """
+        rng = np.random.default_rng(seed)
+        self.dim = dim
+        self.capacity = capacity
+        self._projections = rng.standard_normal((dim, nbits)).astype(np.float32)
+        self._entries = OrderedDict()  # signature bytes -> cached results
+        self.hits = 0
+        self.misses = 0
+
+    def _signature(self, query: str) -> bytes:
+        """Compute the LSH signature for a query string."""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in _WORD_RE.findall(query.lower()):
+            vector[hash(word) % self.dim] += 1.0
+        bits = vector @ self._projections > 0
+        return np.packbits(bits).tobytes()
+
+    def lookup(self, query: str) -> Optional[List[Any]]:
+        """Return cached results for a query, or None on a miss."""
+        signature = self._signature(query)
+        entry = self._entries.get(signature)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(signature)
+        self.hits += 1
+        return entry
+
+    def insert(self, query: str, results: List[Any]):
+        """Cache results for a query, evicting the least recently used entry."""
+        signature = self._signature(query)
+        self._entries[signature] = results
+        self._entries.move_to_end(signature)
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all cached entries (call whenever the corpus changes)."""
+        self._entries.clear()
+        logger.info("🧹 Semantic cache cleared")
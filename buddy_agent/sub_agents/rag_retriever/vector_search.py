@@ -19,12 +19,19 @@ Uses Google Vertex AI embeddings instead of local sentence-transformers to avoid
 """
 
 import logging
+import threading
 import uuid
 import os
+import zlib
+from contextlib import contextmanager
 from typing import List, Dict, Any, Optional
 import chromadb
+import numpy as np
 from google.adk.tools import ToolContext
 
+from ._fused_topk import score_int8
+from ...embed_cache import EmbeddingCache
+
 logger = logging.getLogger(__name__)
 
 # Try to import Vertex AI, fallback to simple text similarity if not available
@@ -38,6 +45,57 @@ except ImportError:
     logger.warning("⚠️ Vertex AI not available, using simple text similarity")
 
 
+class _BufferedIngester:
+    """Accumulates chunks and flushes them to the collection in batches.
+
+    Per-chunk inserts pay serialization and commit overhead on every call;
+    buffering amortizes that across up to buffer_size chunks.
+    """
+
+    def __init__(self, engine, buffer_size: int = 256):
+        self._engine = engine
+        self.buffer_size = buffer_size
+        self._ids = []
+        self._embeddings = []
+        self._texts = []
+        self._metadatas = []
+
+    def add_chunk(self, chunk_id: str, embedding, text: str, metadata: Dict[str, Any]):
+        """Buffer one chunk, flushing when the buffer is full."""
+        self._ids.append(chunk_id)
+        self._embeddings.append(embedding)
+        self._texts.append(text)
+        self._metadatas.append(metadata)
+        if len(self._ids) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Write all buffered chunks with a single collection insert."""
+        if not self._ids:
+            return
+        # The buffer itself is private to one add_document call, but the
+        # collection and the corpus mirror are shared engine state:
+        # create_corpus ingests documents concurrently, and an
+        # unsynchronized flush could interleave the read-modify-write of
+        # the corpus matrix with another writer's, overwriting rows and
+        # misaligning vectors against texts/metadata
+        with self._engine._write_lock:
+            self._engine.collection.add(
+                ids=self._ids,
+                embeddings=self._embeddings,
+                documents=self._texts,
+                metadatas=self._metadatas
+            )
+            # Mirror the normalized vectors in-process for the fallback scan
+            self._engine._append_corpus_vectors(np.asarray(self._embeddings, dtype=np.float32))
+            self._engine._corpus_texts.extend(self._texts)
+            self._engine._corpus_metadata.extend(self._metadatas)
+        self._ids = []
+        self._embeddings = []
+        self._texts = []
+        self._metadatas = []
+
+
 class VectorSearchEngine:
     """Vector search engine for document retrieval using Google Vertex AI embeddings."""
     
@@ -53,7 +111,28 @@ class VectorSearchEngine:
         self.embedding_model = None
         self.chroma_client = None
         self.collection = None
+        # In-process copy of the normalized corpus used by the fallback
+        # search path (cosine == dot product on pre-normalized vectors).
+        # Stored SoA-style: one contiguous int8 matrix (quantized with a
+        # per-row scale, 4x smaller than float32) grown in blocks, plus
+        # parallel lists for chunk text and metadata.
+        self._corpus_vectors = None  # (capacity, dim) int8, C-order
+        self._corpus_scales = None  # (capacity,) float32 dequantization scales
+        self._corpus_count = 0
+        self._corpus_texts = []
+        self._corpus_metadata = []
+        # Serializes ingest flushes into the collection and the corpus
+        # mirror; create_corpus runs add_document on concurrent threads
+        self._write_lock = threading.Lock()
         self._initialize_components()
+        # Chunk embeddings are cached on disk by content hash so
+        # re-ingesting a document never re-calls the embedding model
+        model_id = (
+            "textembedding-gecko-001"
+            if (self.embedding_model and VERTEX_AI_AVAILABLE)
+            else "hashed-bow-384"
+        )
+        self._embed_cache = EmbeddingCache(model_id=model_id)
     
     def _initialize_components(self):
         """Initialize ChromaDB and embedding model."""
@@ -152,37 +231,107 @@ class VectorSearchEngine:
             logger.info(f"🔢 Generating embeddings for {len(texts)} texts")
             
             if self.embedding_model and VERTEX_AI_AVAILABLE:
-                # Use Vertex AI embeddings
+                # Use Vertex AI embeddings, normalized at insert time so
+                # cosine similarity reduces to a plain dot product
                 embeddings = self.embedding_model.get_embeddings(texts)
-                embeddings_list = [emb.values for emb in embeddings]
-                logger.info(f"✅ Generated {len(embeddings_list)} Vertex AI embeddings (dimension: {len(embeddings_list[0])})")
-                return embeddings_list
+                vectors = np.asarray([emb.values for emb in embeddings], dtype=np.float32)
+                vectors = self._normalize_rows(vectors)
+                logger.info(f"✅ Generated {len(vectors)} Vertex AI embeddings (dimension: {vectors.shape[1]})")
+                return vectors.tolist()
             else:
-                # Fallback: Use simple text similarity (no real embeddings)
-                # Create dummy embeddings for ChromaDB compatibility
-                dummy_dimension = 384  # Standard dimension
-                embeddings_list = []
-                for text in texts:
-                    # Create a simple hash-based "embedding" for basic similarity
-                    import hashlib
-                    hash_obj = hashlib.md5(text.encode())
-                    hash_bytes = hash_obj.digest()
-                    # Convert to float vector
-                    embedding = [float(b) / 255.0 for b in hash_bytes[:dummy_dimension]]
-                    # Pad or truncate to desired dimension
-                    while len(embedding) < dummy_dimension:
-                        embedding.append(0.0)
-                    embedding = embedding[:dummy_dimension]
-                    embeddings_list.append(embedding)
-                
-                logger.info(f"✅ Generated {len(embeddings_list)} simple hash-based embeddings (dimension: {dummy_dimension})")
-                return embeddings_list
-            
+                # Fallback: feature-hashed bag-of-words vectors so cosine
+                # similarity still reflects word overlap without a model
+                dimension = 384  # Standard dimension
+                vectors = np.zeros((len(texts), dimension), dtype=np.float32)
+                for row, text in enumerate(texts):
+                    for word in text.lower().split():
+                        vectors[row, zlib.crc32(word.encode()) % dimension] += 1.0
+                vectors = self._normalize_rows(vectors)
+
+                logger.info(f"✅ Generated {len(texts)} hashed bag-of-words embeddings (dimension: {dimension})")
+                return vectors.tolist()
+
         except Exception as e:
             logger.error(f"❌ Error generating embeddings: {str(e)}")
             return []
+
+    @contextmanager
+    def buffered_ingestion(self, buffer_size: int = 256):
+        """Batch chunk inserts to the collection.
+
+        Usage::
+
+            with engine.buffered_ingestion() as ingestion:
+                ingestion.add_chunk(chunk_id, embedding, text, metadata)
+
+        Remaining chunks are flushed on exit.
+        """
+        ingester = _BufferedIngester(self, buffer_size)
+        try:
+            yield ingester
+        finally:
+            ingester.flush()
+
+    def _embed_texts_cached(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, serving cached vectors and only embedding misses."""
+        keys = [EmbeddingCache.key_for(text) for text in texts]
+        hits = self._embed_cache.get_many(keys)
+
+        miss_indices = [i for i, key in enumerate(keys) if key not in hits]
+        if miss_indices:
+            fresh = self.generate_embeddings([texts[i] for i in miss_indices])
+            if not fresh:
+                return []
+            self._embed_cache.put_many([keys[i] for i in miss_indices], fresh)
+            for index, vector in zip(miss_indices, fresh):
+                hits[keys[index]] = np.asarray(vector, dtype=np.float32)
+        else:
+            logger.info(f"✅ All {len(texts)} chunk embeddings served from cache")
+
+        return [hits[key].tolist() for key in keys]
+
+    # Rows added to the corpus matrix per reallocation
+    _GROWTH_BLOCK = 4096
+
+    def _append_corpus_vectors(self, vectors: np.ndarray):
+        """Quantize and append rows to the corpus matrix, growing it in blocks."""
+        quantized, scales = self._quantize_rows(vectors)
+        needed = self._corpus_count + len(vectors)
+        if self._corpus_vectors is None:
+            capacity = max(self._GROWTH_BLOCK, needed)
+            self._corpus_vectors = np.empty((capacity, vectors.shape[1]), dtype=np.int8)
+            self._corpus_scales = np.empty(capacity, dtype=np.float32)
+        elif needed > len(self._corpus_vectors):
+            capacity = len(self._corpus_vectors)
+            while capacity < needed:
+                capacity += self._GROWTH_BLOCK
+            grown = np.empty((capacity, self._corpus_vectors.shape[1]), dtype=np.int8)
+            grown[:self._corpus_count] = self._corpus_vectors[:self._corpus_count]
+            self._corpus_vectors = grown
+            grown_scales = np.empty(capacity, dtype=np.float32)
+            grown_scales[:self._corpus_count] = self._corpus_scales[:self._corpus_count]
+            self._corpus_scales = grown_scales
+        self._corpus_vectors[self._corpus_count:needed] = quantized
+        self._corpus_scales[self._corpus_count:needed] = scales
+        self._corpus_count = needed
+
+    @staticmethod
+    def _quantize_rows(vectors: np.ndarray):
+        """Quantize float rows to int8 with a per-row dequantization scale."""
+        peaks = np.max(np.abs(vectors), axis=1)
+        peaks[peaks == 0] = 1.0
+        scales = (127.0 / peaks).astype(np.float32)
+        quantized = np.rint(vectors * scales[:, None]).astype(np.int8)
+        return quantized, scales
+
+    @staticmethod
+    def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+        """L2-normalize each row, leaving all-zero rows untouched."""
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
     
-    def add_document(self, document_id: str, text: str, metadata: Dict[str, Any] = None) -> bool:
+    def add_document(self, document_id: str, text: str, metadata: Dict[str, Any] = None) -> int:
         """Add a document to the vector database.
         
         Args:
@@ -191,7 +340,8 @@ class VectorSearchEngine:
             metadata: Additional document metadata
             
         Returns:
-            True if successful, False otherwise
+            Number of chunks added, 0 on failure (so callers can keep
+            treating the result as a success flag)
         """
         try:
             logger.info(f"📚 Adding document to vector database: {document_id}")
@@ -200,7 +350,7 @@ class VectorSearchEngine:
             chunks = self.chunk_document(text)
             if not chunks:
                 logger.warning("⚠️ No chunks created from document")
-                return False
+                return 0
             
             # Prepare data for ChromaDB
             chunk_texts = [chunk["text"] for chunk in chunks]
@@ -219,26 +369,25 @@ class VectorSearchEngine:
                     chunk_meta.update(metadata)
                 chunk_metadata.append(chunk_meta)
             
-            # Generate embeddings
-            embeddings = self.generate_embeddings(chunk_texts)
+            # Generate embeddings (cached chunks skip the model call)
+            embeddings = self._embed_texts_cached(chunk_texts)
             if not embeddings:
                 logger.error("❌ Failed to generate embeddings")
-                return False
+                return 0
             
-            # Add to ChromaDB collection
-            self.collection.add(
-                ids=chunk_ids,
-                embeddings=embeddings,
-                documents=chunk_texts,
-                metadatas=chunk_metadata
-            )
+            # Add to ChromaDB collection in buffered batches
+            with self.buffered_ingestion() as ingestion:
+                for chunk_id, embedding, chunk_text, chunk_meta in zip(
+                    chunk_ids, embeddings, chunk_texts, chunk_metadata
+                ):
+                    ingestion.add_chunk(chunk_id, embedding, chunk_text, chunk_meta)
             
             logger.info(f"✅ Successfully added document {document_id} with {len(chunks)} chunks")
-            return True
+            return len(chunks)
             
         except Exception as e:
             logger.error(f"❌ Error adding document {document_id}: {str(e)}")
-            return False
+            return 0
     
     def search_similar(self, query: str, n_results: int = 5, threshold: float = 0.6) -> List[Dict[str, Any]]:
         """Search for similar document chunks.
@@ -298,49 +447,57 @@ class VectorSearchEngine:
             return []
     
     def _simple_text_search(self, query: str, n_results: int = 5, threshold: float = 0.6) -> List[Dict[str, Any]]:
-        """Simple text-based search as fallback when embeddings are not available.
-        
+        """Fallback search over the in-process normalized corpus.
+
+        Vectors are normalized at insert time, so cosine similarity is a
+        single dot product against the stacked corpus matrix instead of a
+        per-chunk Python loop.
+
         Args:
             query: Search query text
             n_results: Number of results to return
             threshold: Similarity threshold (0-1)
-            
+
         Returns:
             List of similar document chunks with scores
         """
         try:
-            # Get all documents from collection
-            all_docs = self.collection.get(include=["documents", "metadatas"])
-            
-            if not all_docs or not all_docs["documents"]:
+            if not self._corpus_count:
                 return []
-            
-            # Simple keyword-based scoring
-            query_words = set(query.lower().split())
+
+            query_embedding = self.generate_embeddings([query])
+            if not query_embedding:
+                return []
+            query_vector = np.asarray(query_embedding[0], dtype=np.float32)
+
+            # One integer dot product scores the whole quantized corpus,
+            # then only the k-slice gets sorted
+            corpus = self._corpus_vectors[:self._corpus_count]
+            query_quantized, query_scale = self._quantize_rows(query_vector[None, :])
+            int_scores = score_int8(corpus, query_quantized[0].astype(np.int32))
+            scores = int_scores.astype(np.float32) / (
+                self._corpus_scales[:self._corpus_count] * query_scale[0]
+            )
+
+            k = min(n_results, self._corpus_count)
+            top = np.argpartition(-scores, k - 1)[:k]
+            order = top[np.argsort(-scores[top])]
             scored_chunks = []
-            
-            for i, (doc, metadata) in enumerate(zip(all_docs["documents"], all_docs["metadatas"])):
-                doc_words = set(doc.lower().split())
-                
-                # Calculate simple Jaccard similarity
-                intersection = len(query_words.intersection(doc_words))
-                union = len(query_words.union(doc_words))
-                similarity_score = intersection / union if union > 0 else 0
-                
-                if similarity_score >= threshold:
-                    scored_chunks.append({
-                        "document_id": metadata["document_id"],
-                        "chunk_text": doc,
-                        "similarity_score": similarity_score,
-                        "distance": 1 - similarity_score,
-                        "metadata": metadata,
-                        "rank": len(scored_chunks) + 1
-                    })
-            
-            # Sort by similarity score and return top results
-            scored_chunks.sort(key=lambda x: x["similarity_score"], reverse=True)
-            return scored_chunks[:n_results]
-            
+            for index in order:
+                similarity_score = float(scores[index])
+                if similarity_score < threshold:
+                    break
+                scored_chunks.append({
+                    "document_id": self._corpus_metadata[index]["document_id"],
+                    "chunk_text": self._corpus_texts[index],
+                    "similarity_score": similarity_score,
+                    "distance": 1 - similarity_score,
+                    "metadata": self._corpus_metadata[index],
+                    "rank": len(scored_chunks) + 1
+                })
+
+            return scored_chunks
+
         except Exception as e:
             logger.error(f"❌ Error in simple text search: {str(e)}")
             return []
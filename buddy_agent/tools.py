@@ -108,21 +108,26 @@ async def _extract_pdf_text(document_bytes: bytes) -> tuple[str, Dict[str, Any]]
     """Extract text from PDF document bytes."""
     try:
         with io.BytesIO(document_bytes) as pdf_file:
-            text = ""
             metadata = {"pages": 0, "sections": []}
-            
+
             with pdfplumber.open(pdf_file) as pdf:
                 metadata["pages"] = len(pdf.pages)
-                
-                for page_num, page in enumerate(pdf.pages, 1):
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += f"\n--- Page {page_num} ---\n{page_text}\n"
-                        metadata["sections"].append({
-                            "page": page_num,
-                            "characters": len(page_text)
-                        })
-            
+
+                # Extract each page once, then build text and metadata in one pass
+                page_texts = [
+                    (page_num, page_text)
+                    for page_num, page in enumerate(pdf.pages, 1)
+                    if (page_text := page.extract_text())
+                ]
+                text = "".join(
+                    f"\n--- Page {page_num} ---\n{page_text}\n"
+                    for page_num, page_text in page_texts
+                )
+                metadata["sections"] = [
+                    {"page": page_num, "characters": len(page_text)}
+                    for page_num, page_text in page_texts
+                ]
+
             return text, metadata
             
     except Exception as e:
@@ -135,20 +140,24 @@ async def _extract_word_text(document_bytes: bytes) -> tuple[str, Dict[str, Any]
     try:
         with io.BytesIO(document_bytes) as doc_file:
             doc = docx.Document(doc_file)
-            text = ""
             metadata = {"paragraphs": 0, "sections": []}
-            
-            for para_num, paragraph in enumerate(doc.paragraphs, 1):
-                para_text = paragraph.text.strip()
-                if para_text:
-                    text += f"{para_text}\n"
-                    metadata["sections"].append({
-                        "paragraph": para_num,
-                        "text": para_text[:100] + "..." if len(para_text) > 100 else para_text
-                    })
-            
-            metadata["paragraphs"] = len([p for p in doc.paragraphs if p.text.strip()])
-            
+
+            # Strip each paragraph once, then build text and metadata in one pass
+            para_texts = [
+                (para_num, para_text)
+                for para_num, paragraph in enumerate(doc.paragraphs, 1)
+                if (para_text := paragraph.text.strip())
+            ]
+            text = "".join(f"{para_text}\n" for _, para_text in para_texts)
+            metadata["sections"] = [
+                {
+                    "paragraph": para_num,
+                    "text": para_text[:100] + "..." if len(para_text) > 100 else para_text
+                }
+                for para_num, para_text in para_texts
+            ]
+            metadata["paragraphs"] = len(para_texts)
+
             return text, metadata
             
     except Exception as e:
@@ -0,0 +1,30 @@
+"""Gunicorn configuration for the Buddy Agent web interface.
+
+Run with:
+
+    gunicorn -c gunicorn_conf.py app:app
+
+The Werkzeug dev server started by ``python app.py`` handles one request
+at a time; /ask and /upload are mostly I/O-bound, so a threaded worker
+lets many in-flight requests overlap.
+
+This config deliberately runs a single worker process. The search index
+and duplicate-upload bookkeeping live in process memory, so with several
+forked workers each one holds a private index and an upload is visible
+only to the worker that happened to receive it - /ask routed to any
+other worker misses the document. Threads all share the one process's
+index, and the plain threaded worker leaves ``threading`` unpatched, so
+the background upload executor keeps parsing PDFs on real threads
+instead of a monkey-patched greenlet that would stall the event loop.
+Scaling past one process requires moving the index to a shared store
+first.
+"""
+
+bind = "0.0.0.0:5000"
+workers = 1
+worker_class = "gthread"
+threads = 16
+
+# Uploads are queued and parsed on a background thread, so requests are
+# short; a modest timeout catches wedged workers without killing slow I/O
+timeout = 60
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Buddy Agent - Background Upload Processing
+Runs document text extraction on a worker thread so the Flask
+request thread only has to persist the raw upload bytes.
+"""
+
+import io
+import logging
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Parsers are imported once at worker-module load instead of per call,
+# avoiding repeated sys.modules lookups and import-lock acquisition.
+import pdfplumber
+import pypdfium2 as pdfium
+from docx import Document as DocxDocument
+
+logger = logging.getLogger(__name__)
+
+# Single background worker keeps uploads processed in order while the
+# request thread returns immediately after saving the raw bytes.
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="upload-worker")
+
+# Shared process pool for CPU-bound page extraction, created on first use
+# so the fork cost is paid once instead of per document.
+_page_pool = None
+
+
+def _get_page_pool():
+    """Get the shared process pool for parallel page extraction."""
+    global _page_pool
+    if _page_pool is None:
+        _page_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+    return _page_pool
+
+
+def _extract_page_range(pdf_bytes, start, end):
+    """Extract text from pages [start:end) in a worker process.
+
+    Takes raw bytes because PDF document objects are not picklable. Uses
+    the PDFium C library for plain-text extraction and falls back to
+    pdfplumber for documents where PDFium yields no text.
+    """
+    pages = []
+    pdf = pdfium.PdfDocument(pdf_bytes)
+    try:
+        for index in range(start, end):
+            page_text = pdf[index].get_textpage().get_text_range()
+            if page_text:
+                pages.append(f"\n{page_text}\n")
+    finally:
+        pdf.close()
+
+    if pages:
+        return start, pages
+
+    # Fallback: pdfplumber's layout analysis recovers text from some
+    # documents PDFium cannot read
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        for page in pdf.pages[start:end]:
+            page_text = page.extract_text()
+            if page_text:
+                pages.append(f"\n{page_text}\n")
+    return start, pages
+
+# Content hashes of uploads that were already queued or processed.
+# Used as an idempotency check so re-uploading the same file is a no-op.
+processed_docs = set()
+
+
+def extract_text_from_file(file_path, file_type):
+    """Extract text from an uploaded file. Runs on the worker thread."""
+    try:
+        if file_type == 'pdf':
+            with open(file_path, 'rb') as f:
+                pdf_bytes = f.read()
+
+            pdf = pdfium.PdfDocument(pdf_bytes)
+            total_pages = len(pdf)
+            pdf.close()
+
+            workers = min(os.cpu_count() or 1, total_pages)
+            if workers <= 1:
+                # Not worth the pickling overhead for tiny documents
+                _, pages = _extract_page_range(pdf_bytes, 0, total_pages)
+                return "".join(pages)
+
+            # Split the page range across the process pool and join in order
+            per_worker = math.ceil(total_pages / workers)
+            futures = [
+                _get_page_pool().submit(_extract_page_range, pdf_bytes, start,
+                                        min(start + per_worker, total_pages))
+                for start in range(0, total_pages, per_worker)
+            ]
+            results = sorted((future.result() for future in futures),
+                             key=lambda result: result[0])
+            return "".join("".join(pages) for _, pages in results)
+
+        elif file_type == 'docx':
+            doc = DocxDocument(file_path)
+            return "".join(f"{paragraph.text}\n" for paragraph in doc.paragraphs)
+
+        elif file_type == 'txt':
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return f.read()
+
+        return ""
+
+    except Exception as e:
+        logger.error(f"Error extracting text: {str(e)}")
+        return ""
+
+
+def process_uploads(search_engine, uploads, query_cache=None):
+    """Extract text from saved uploads and index them as one batch.
+
+    Runs on the worker thread. ``uploads`` is a list of dicts with
+    file_path, filename, file_type, document_id and metadata keys.
+    """
+    try:
+        document_ids = []
+        texts = []
+        metadatas = []
+        done_paths = []
+
+        for upload in uploads:
+            text = extract_text_from_file(upload["file_path"], upload["file_type"])
+            if not text.strip():
+                logger.error(f"Could not extract text from file: {upload['filename']}")
+                continue
+
+            document_ids.append(upload["document_id"])
+            texts.append(text)
+            metadatas.append(dict(upload["metadata"], file_size=len(text)))
+            done_paths.append(upload["file_path"])
+
+        if not document_ids:
+            return
+
+        # One engine call for the whole batch instead of one per file
+        added = search_engine.add_documents_batch(document_ids, texts, metadatas)
+
+        if added:
+            logger.info(f"Processed {added}/{len(uploads)} uploaded documents")
+            if query_cache is not None:
+                # Cached answers are stale once the corpus grows
+                query_cache.clear()
+            # Clean up uploaded files
+            for file_path in done_paths:
+                os.remove(file_path)
+        else:
+            logger.error("Failed to process uploaded documents")
+
+    except Exception as e:
+        logger.error(f"Worker error processing uploads: {str(e)}")
+
+
+def enqueue_uploads(search_engine, uploads, query_cache=None):
+    """Queue a batch of saved uploads for background processing."""
+    _executor.submit(process_uploads, search_engine, uploads, query_cache)
+    logger.info(f"Queued {len(uploads)} document(s) for processing")